@@ -56,6 +56,16 @@ class GenerationRequest(BaseModel):
         ge=1000,
         le=100000
     )
+    enhance_mode: Optional[Literal["realesrgan", "bicubic", "lanczos", "skip"]] = Field(
+        None,
+        description="Upscaling of the generated views before baking, the server default if not set"
+    )
+    unsharp_amount: Optional[float] = Field(
+        None,
+        description="Unsharp mask strength after bicubic or lanczos upscaling, the server default if not set",
+        ge=0.0,
+        le=5.0
+    )
 
 
 class GenerationResponse(BaseModel):
@@ -202,6 +202,7 @@ if __name__ == "__main__":
     parser.add_argument("--limit-model-concurrency", type=int, default=5)
     parser.add_argument('--low_vram_mode', action='store_true')
     parser.add_argument('--cache-path', type=str, default='./gradio_cache')
+    parser.add_argument('--shared-weights-dir', type=str, default=None)
     args = parser.parse_args()
     logger.info(f"args: {args}")
 
@@ -219,6 +220,7 @@ if __name__ == "__main__":
         low_vram_mode=args.low_vram_mode,
         worker_id=worker_id,
         model_semaphore=model_semaphore,
-        save_dir=SAVE_DIR
+        save_dir=SAVE_DIR,
+        shared_weights_dir=args.shared_weights_dir
     )
     uvicorn.run(app, host=args.host, port=args.port, log_level="info")
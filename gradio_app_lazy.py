@@ -47,6 +47,7 @@ i23d_worker = None
 floater_remove_worker = None
 degenerate_face_remove_worker = None
 face_reduce_worker = None
+mesh_cleanup_worker = None
 tex_pipeline = None
 t2i_worker = None
 
@@ -68,7 +69,7 @@ def get_gpu_memory_info():
 def _lazy_load_if_needed(progress=gr.Progress(track_tqdm=True)):
     """Ensure heavy models are loaded only on demand, with visible progress."""
     global MODEL_READY, rmbg_worker, i23d_worker, floater_remove_worker
-    global degenerate_face_remove_worker, face_reduce_worker, tex_pipeline, t2i_worker
+    global degenerate_face_remove_worker, face_reduce_worker, mesh_cleanup_worker, tex_pipeline, t2i_worker
 
     if MODEL_READY:
         progress(1.0, desc="✅ Models already loaded")
@@ -105,10 +106,13 @@ def _lazy_load_if_needed(progress=gr.Progress(track_tqdm=True)):
 
         # Stage 4: Load mesh processing workers
         progress(0.55, desc="🔧 Loading mesh processing tools...")
-        from hy3dshape import FaceReducer, FloaterRemover, DegenerateFaceRemover
+        from hy3dshape import FaceReducer, FloaterRemover, DegenerateFaceRemover, MeshCleanupChain
         floater_remove_worker = FloaterRemover()
         degenerate_face_remove_worker = DegenerateFaceRemover()
         face_reduce_worker = FaceReducer()
+        mesh_cleanup_worker = MeshCleanupChain(
+            [floater_remove_worker, degenerate_face_remove_worker, face_reduce_worker]
+        )
 
         # Stage 5: Load texture generation pipeline if enabled
         if HAS_TEXTUREGEN:
@@ -147,7 +151,7 @@ def _lazy_load_if_needed(progress=gr.Progress(track_tqdm=True)):
 def _unload_models_handler(progress=gr.Progress(track_tqdm=True)):
     """Release GPU memory and mark model as unloaded."""
     global MODEL_READY, rmbg_worker, i23d_worker, floater_remove_worker
-    global degenerate_face_remove_worker, face_reduce_worker, tex_pipeline, t2i_worker
+    global degenerate_face_remove_worker, face_reduce_worker, mesh_cleanup_worker, tex_pipeline, t2i_worker
 
     import gc
     progress(0.1, desc="🗑️ Releasing model references...")
@@ -158,6 +162,7 @@ def _unload_models_handler(progress=gr.Progress(track_tqdm=True)):
     floater_remove_worker = None
     degenerate_face_remove_worker = None
     face_reduce_worker = None
+    mesh_cleanup_worker = None
     tex_pipeline = None
     t2i_worker = None
 
@@ -582,20 +587,17 @@ def generation_all(
     print(path)
     print('='*40)
 
-    # tmp_time = time.time()
-    # mesh = floater_remove_worker(mesh)
-    # mesh = degenerate_face_remove_worker(mesh)
-    # logger.info("---Postprocessing takes %s seconds ---" % (time.time() - tmp_time))
-    # stats['time']['postprocessing'] = time.time() - tmp_time
-
     tmp_time = time.time()
-    mesh = face_reduce_worker(mesh)
+    # face reduction only, floater and degenerate face removal stay off here (core dumps)
+    mesh, cleanup_timings = mesh_cleanup_worker(mesh, return_timings=True, only=['FaceReducer'])
 
     # path = export_mesh(mesh, save_folder, textured=False, type='glb')
     path = export_mesh(mesh, save_folder, textured=False, type='obj') # 这样操作也会 core dump
 
-    logger.info("---Face Reduction takes %s seconds ---" % (time.time() - tmp_time))
-    stats['time']['face reduction'] = time.time() - tmp_time
+    logger.info("---Postprocessing takes %s seconds ---" % (time.time() - tmp_time))
+    stats['time']['postprocessing'] = time.time() - tmp_time
+    for op_name, op_time in cleanup_timings.items():
+        stats['time'][f'postprocessing {op_name}'] = op_time
 
     tmp_time = time.time()
 
@@ -1023,10 +1025,10 @@ Fast for very complex cases, Standard seldom use.',
                                                             textured=True)
             else:
                 mesh = trimesh.load(file_out)
-                mesh = floater_remove_worker(mesh)
-                mesh = degenerate_face_remove_worker(mesh)
+                cleanup_ops = ['FloaterRemover', 'DegenerateFaceRemover']
                 if reduce_face:
-                    mesh = face_reduce_worker(mesh, target_face_num)
+                    cleanup_ops.append('FaceReducer')
+                mesh = mesh_cleanup_worker(mesh, only=cleanup_ops, FaceReducer=dict(max_facenum=target_face_num))
                 save_folder = gen_save_folder()
                 path = export_mesh(mesh, save_folder, textured=False, type=file_type)
 
@@ -12,6 +12,7 @@
 # fine-tuning enabling code and other elements of the foregoing made publicly available
 # by Tencent in accordance with TENCENT HUNYUAN COMMUNITY LICENSE AGREEMENT.
 
+import uuid
 import cv2
 import torch
 import trimesh
@@ -20,6 +21,7 @@ from PIL import Image
 import torch.nn.functional as F
 from typing import Union, Optional, Tuple, List, Any, Callable
 from dataclasses import dataclass
+from collections import OrderedDict
 from enum import Enum
 from .camera_utils import (
     transform_pos,
@@ -28,6 +30,8 @@ from .camera_utils import (
     get_perspective_projection_matrix,
 )
 
+from .textured_mesh_utils import to_textured_trimesh
+
 try:
     from .mesh_utils import load_mesh, save_mesh
 except:
@@ -85,6 +89,66 @@ class ViewState:
     pos_camera: torch.Tensor
     pos_clip: torch.Tensor
     resolution: Tuple[int, int]
+    raster: Optional[dict] = None
+
+
+class TextureBakeAccumulator:
+    """
+    Running cosine-weighted merge of back-projected textures.
+
+    Each view is added once, so baking N views costs N updates instead of re-merging every view
+    so far after each new one. Views that are already 99% painted are skipped against the running
+    coverage, which gives the same result as `MeshRender.fast_bake_texture` over the same views.
+    """
+
+    def __init__(self, texture_size: Tuple[int, int], channel: int, device):
+        self.texture_sum = torch.zeros(tuple(texture_size) + (channel,), device=device)
+        self.weight_sum = torch.zeros(tuple(texture_size) + (1,), device=device)
+
+    def add(self, texture: torch.Tensor, cos_map: torch.Tensor) -> bool:
+        """Add one view, returns False when it was skipped."""
+        view_sum = (cos_map > 0).sum()
+        painted_sum = ((cos_map > 0) * (self.weight_sum > 0)).sum()
+        if painted_sum / view_sum > 0.99:
+            return False
+        self.texture_sum += texture * cos_map
+        self.weight_sum += cos_map
+        return True
+
+    def result(self) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Return the (merged_texture, valid_mask) of the views added so far."""
+        texture_merge = self.texture_sum / torch.clamp(self.weight_sum, min=1e-8)
+        return texture_merge, self.weight_sum > 1e-8
+
+
+def pull_push_inpaint(texture: torch.Tensor, mask: torch.Tensor) -> torch.Tensor:
+    """
+    Fill the texels of a [H, W, C] texture outside the [H, W] boolean mask by pull-push interpolation.
+
+    The pull phase averages the known texels into a mip pyramid, each coarse texel being the mean of its
+    known children. The push phase walks back to full resolution, filling the unknown texels of each level
+    with the bilinearly upsampled coarser level, so holes get a smooth extension of their borders in
+    O(H * W) on the texture device. Known texels are kept unchanged.
+    """
+    image = texture.permute(2, 0, 1).unsqueeze(0).float()
+    weight = mask.to(image.device, image.dtype)[None, None]
+    levels = []
+    while max(image.shape[-2:]) > 1 and not bool((weight > 0).all()):
+        levels.append((image, weight))
+        # a dimension already down to 1 is not pooled further, so non-square textures reach a single texel
+        height, width = image.shape[-2:]
+        kernel = (2 if height > 1 else 1, 2 if width > 1 else 1)
+        # odd sizes are padded with unknown texels, which the weights leave out of the averages
+        pad = (0, width % 2 if width > 1 else 0, 0, height % 2 if height > 1 else 0)
+        color_sum = F.avg_pool2d(F.pad(image * weight, pad), kernel)
+        weight_sum = F.avg_pool2d(F.pad(weight, pad), kernel)
+        image = color_sum / weight_sum.clamp(min=1e-8)
+        weight = (weight_sum * kernel[0] * kernel[1]).clamp(max=1)
+
+    for fine_image, fine_weight in reversed(levels):
+        coarse = F.interpolate(image, size=fine_image.shape[-2:], mode="bilinear", align_corners=False)
+        image = fine_image * fine_weight + coarse * (1 - fine_weight)
+    return image[0].permute(1, 2, 0).to(texture.dtype)
 
 
 def stride_from_shape(shape):
@@ -335,6 +399,7 @@ class MeshRender:
         shader_type="face",
         use_opengl=False,
         device="cuda",
+        raster_cache_bytes=1 << 30,
     ):
         """
         Initialize mesh renderer with configurable parameters.
@@ -352,6 +417,7 @@ class MeshRender:
             shader_type: Shading type ("face" or "vertex")
             use_opengl: Whether to use OpenGL backend (deprecated)
             device: Computing device ("cuda" or "cpu")
+            raster_cache_bytes: Memory budget in bytes of the view rasterizations kept for reuse, 0 disables the cache
         """
 
         self.device = device
@@ -368,6 +434,12 @@ class MeshRender:
         self.bake_mode = bake_mode
         self.shader_type = shader_type
 
+        # per-view rasterization reused by all render modes and back-projection, see `_get_view_raster`
+        self.raster_cache_bytes = raster_cache_bytes
+        self._raster_cache = OrderedDict()
+        # cache entries are keyed by the request (mesh load) they were rasterized for
+        self._raster_cache_scope = uuid.uuid4().hex
+
         self.raster_mode = raster_mode
         if self.raster_mode == "cr":
             import custom_rasterizer as cr
@@ -387,21 +459,86 @@ class MeshRender:
 
         # Removed multiprocessing components for single-threaded version
 
-    def _create_view_state(self, config: RenderConfig) -> ViewState:
-        """Create unified view state for rendering pipeline."""
+    def _view_key(self, elev, azim, camera_distance, center, resolution):
+        """Cache key of a view: request scope, camera parameters, projection and resolution."""
+        camera_distance = self.camera_distance if camera_distance is None else camera_distance
         proj = self.camera_proj_mat
+        proj = proj.cpu().numpy() if isinstance(proj, torch.Tensor) else np.asarray(proj)
+        center = None if center is None else tuple(np.asarray(center, dtype=np.float64).reshape(-1).tolist())
+        return (
+            self._raster_cache_scope, float(elev), float(azim), float(camera_distance), center,
+            tuple(int(x) for x in resolution), proj.tobytes(),
+        )
+
+    @staticmethod
+    def _raster_entry_bytes(entry):
+        tensors = [value for value in entry.values() if isinstance(value, torch.Tensor)]
+        tensors += [value for value in entry["attrs"].values() if isinstance(value, torch.Tensor)]
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+    def _evict_raster_cache(self):
+        """Drop the least recently used views until the cache fits in `raster_cache_bytes`."""
+        total = sum(self._raster_entry_bytes(entry) for entry in self._raster_cache.values())
+        while total > self.raster_cache_bytes and len(self._raster_cache) > 0:
+            _, entry = self._raster_cache.popitem(last=False)
+            total -= self._raster_entry_bytes(entry)
+
+    def _store_view_raster(self, key, entry):
+        if self.raster_cache_bytes <= 0:
+            return entry
+        self._raster_cache[key] = entry
+        self._evict_raster_cache()
+        return entry
+
+    def _get_view_raster(self, elev, azim, camera_distance=None, center=None, resolution=None):
+        """
+        Rasterize a view once and reuse it across render modes and back-projection.
+
+        Returns:
+            Dict with "pos_camera" [N, 4], "pos_clip" [1, N, 4], "rast_out" [1, H, W, 4] and an "attrs" dict
+            of attributes already interpolated for this view
+        """
+        resolution = _ensure_resolution_format(resolution, self.default_resolution)
+        key = self._view_key(elev, azim, camera_distance, center, resolution)
+        entry = self._raster_cache.get(key)
+        if entry is not None:
+            self._raster_cache.move_to_end(key)
+            return entry
+
         r_mv = get_mv_matrix(
-            elev=config.elev,
-            azim=config.azim,
-            camera_distance=self.camera_distance if config.camera_distance is None else config.camera_distance,
-            center=config.center,
+            elev=elev,
+            azim=azim,
+            camera_distance=self.camera_distance if camera_distance is None else camera_distance,
+            center=center,
         )
-        
         pos_camera = transform_pos(r_mv, self.vtx_pos, keepdim=True)
-        pos_clip = transform_pos(proj, pos_camera)
+        pos_clip = transform_pos(self.camera_proj_mat, pos_camera)
+        rast_out, _ = self.raster_rasterize(pos_clip, self.pos_idx, resolution=resolution)
+        entry = {"r_mv": r_mv, "pos_camera": pos_camera, "pos_clip": pos_clip, "rast_out": rast_out, "attrs": {}}
+        return self._store_view_raster(key, entry)
+
+    def _interpolate_view_attr(self, entry, name, attr, idx):
+        """Interpolate a vertex attribute over a cached view raster, once per view and attribute name."""
+        if name in entry["attrs"]:
+            return entry["attrs"][name]
+        value, _ = self.raster_interpolate(attr, entry["rast_out"], idx)
+        entry["attrs"][name] = value
+        # interpolated attributes count towards the entry's size
+        self._evict_raster_cache()
+        return value
+
+    def clear_raster_cache(self):
+        """Drop all cached view rasterizations."""
+        self._raster_cache.clear()
+
+    def _create_view_state(self, config: RenderConfig) -> ViewState:
+        """Create unified view state for rendering pipeline."""
         resolution = _ensure_resolution_format(config.resolution, self.default_resolution)
+        entry = self._get_view_raster(config.elev, config.azim, config.camera_distance, config.center, resolution)
         
-        return ViewState(proj, r_mv, pos_camera, pos_clip, resolution)
+        return ViewState(
+            self.camera_proj_mat, entry["r_mv"], entry["pos_camera"], entry["pos_clip"], resolution, entry
+        )
 
     def _compute_face_normals(self, triangles: torch.Tensor) -> torch.Tensor:
         """Compute face normals from triangle vertices."""
@@ -425,7 +562,8 @@ class MeshRender:
         face_normals = self._compute_face_normals(mesh_triangles)
         
         # Common rasterization
-        rast_out, _ = self.raster_rasterize(view_state.pos_clip, self.pos_idx, resolution=view_state.resolution)
+        entry = view_state.raster
+        rast_out = entry["rast_out"]
         
         if self.shader_type == "vertex":
             vertex_normals = trimesh.geometry.mean_vertex_normals(
@@ -434,7 +572,8 @@ class MeshRender:
                 face_normals=face_normals.cpu(),
             )
             vertex_normals = torch.from_numpy(vertex_normals).float().to(self.device).contiguous()
-            normal, _ = self.raster_interpolate(vertex_normals[None, ...], rast_out, self.pos_idx)
+            name = "vertex_normal_abs" if use_abs_coor else "vertex_normal_camera"
+            normal = self._interpolate_view_attr(entry, name, vertex_normals[None, ...], self.pos_idx)
         
         elif self.shader_type == "face":
             tri_ids = rast_out[..., 3]
@@ -450,7 +589,7 @@ class MeshRender:
         view_state = self._create_view_state(config)
         
         if mode == RenderMode.ALPHA:
-            rast_out, _ = self.raster_rasterize(view_state.pos_clip, self.pos_idx, resolution=view_state.resolution)
+            rast_out = view_state.raster["rast_out"]
             return rast_out[..., -1:].long()
         
         elif mode == RenderMode.UV_POS:
@@ -474,12 +613,12 @@ class MeshRender:
             return result[0, ...]
         
         elif mode == RenderMode.POSITION:
-            rast_out, _ = self.raster_rasterize(view_state.pos_clip, self.pos_idx, resolution=view_state.resolution)
+            rast_out = view_state.raster["rast_out"]
             
             tex_position = 0.5 - self.vtx_pos[:, :3] / self.scale_factor
             tex_position = tex_position.contiguous()
             
-            position, _ = self.raster_interpolate(tex_position[None, ...], rast_out, self.pos_idx)
+            position = self._interpolate_view_attr(view_state.raster, "position", tex_position[None, ...], self.pos_idx)
             visible_mask = torch.clamp(rast_out[..., -1:], 0, 1)
             
             result = _apply_background_mask(position, visible_mask, config.bg_color, self.device)
@@ -489,6 +628,139 @@ class MeshRender:
             
             return result[0, ...]
 
+    def _create_view_states_batch(self, elevs, azims, camera_distance=None, center=None):
+        """Transform the vertices to camera and clip space for a stack of views in one matmul."""
+        camera_distance = self.camera_distance if camera_distance is None else camera_distance
+        mv_mats = np.stack(
+            [
+                get_mv_matrix(elev=elev, azim=azim, camera_distance=camera_distance, center=center)
+                for elev, azim in zip(elevs, azims)
+            ]
+        )
+        mv_mats = torch.from_numpy(mv_mats).to(self.vtx_pos)
+        proj = self.camera_proj_mat
+        proj = torch.from_numpy(proj).to(self.vtx_pos) if isinstance(proj, np.ndarray) else proj.to(self.vtx_pos)
+
+        posw = torch.cat([self.vtx_pos, torch.ones_like(self.vtx_pos[:, :1])], dim=1)
+        pos_camera = torch.matmul(posw, mv_mats.transpose(1, 2))
+        pos_clip = torch.matmul(pos_camera, proj.t())
+        return pos_camera, pos_clip
+
+    def _rasterize_views(self, elevs, azims, camera_distance, center, resolution):
+        """Rasterize a stack of views, reusing cached views and rasterizing the others in one batch."""
+        keys = [self._view_key(elev, azim, camera_distance, center, resolution) for elev, azim in zip(elevs, azims)]
+        pos_camera, pos_clip = self._create_view_states_batch(elevs, azims, camera_distance, center)
+        rasters = {}
+        for i, key in enumerate(keys):
+            if key in self._raster_cache:
+                rasters[i] = self._raster_cache[key]["rast_out"]
+                self._raster_cache.move_to_end(key)
+        missing = [i for i in range(len(keys)) if i not in rasters]
+        if len(missing) > 0:
+            rast_out, _ = self.raster_rasterize_batch(pos_clip[missing], self.pos_idx, resolution=resolution)
+            for j, i in enumerate(missing):
+                rasters[i] = rast_out[j:j + 1]
+                self._store_view_raster(keys[i], {
+                    "r_mv": get_mv_matrix(
+                        elev=elevs[i],
+                        azim=azims[i],
+                        camera_distance=self.camera_distance if camera_distance is None else camera_distance,
+                        center=center,
+                    ),
+                    "pos_camera": pos_camera[i],
+                    "pos_clip": pos_clip[i:i + 1],
+                    "rast_out": rasters[i],
+                    "attrs": {},
+                })
+        rast_out = torch.cat([rasters[i] for i in range(len(keys))], dim=0)
+        return rast_out, pos_camera, pos_clip
+
+    def _interpolate_views(self, attr, rast_out, idx):
+        """
+        Interpolate per-view vertex attributes [V, N, C] over a stack of rasterized views.
+
+        Views and triangle corners are gathered one at a time, so the temporaries stay at [H, W, C]
+        rather than [V, H, W, 3, C] with an int64 index of the same size.
+        """
+        result = attr.new_zeros(*rast_out.shape[:-1], attr.shape[-1])
+        for v in range(rast_out.shape[0]):
+            findices = rast_out[v, ..., -1].long()
+            f = findices - 1 + (findices == 0)
+            for corner in range(3):
+                result[v] += rast_out[v, ..., corner:corner + 1] * attr[v, idx[f, corner].long()]
+        return result
+
+    def _render_views_pipeline(self, elevs, azims, mode: RenderMode, camera_distance=None, center=None,
+                               resolution=None, bg_color=[1, 1, 1], batch_size=8, supersample=1,
+                               **kwargs) -> torch.Tensor:
+        """
+        Batched counterpart of `_unified_render_pipeline`, renders the views in chunks of `batch_size`.
+
+        With `supersample > 1` the views are rasterized at `supersample` times the resolution and
+        area-downsampled, which antialiases edges when rendering directly at a small output size.
+        """
+        resolution = _ensure_resolution_format(resolution, self.default_resolution)
+        if supersample > 1 and mode != RenderMode.ALPHA:
+            images = self._render_views_pipeline(
+                elevs, azims, mode, camera_distance, center, (resolution[0] * supersample, resolution[1] * supersample),
+                bg_color, batch_size, **kwargs
+            )
+            images = F.avg_pool2d(images.permute(0, 3, 1, 2), kernel_size=supersample)
+            return images.permute(0, 2, 3, 1).contiguous()
+        results = []
+        for start in range(0, len(elevs), batch_size):
+            rast_out, pos_camera, pos_clip = self._rasterize_views(
+                elevs[start:start + batch_size], azims[start:start + batch_size], camera_distance, center, resolution
+            )
+            num_views = pos_clip.shape[0]
+
+            if mode == RenderMode.ALPHA:
+                results.append(rast_out[..., -1:].long())
+                continue
+
+            visible_mask = torch.clamp(rast_out[..., -1:], 0, 1)
+            if mode == RenderMode.NORMAL:
+                if kwargs.get('use_abs_coor', False):
+                    triangles = self.vtx_pos[self.pos_idx[:, :3], :].unsqueeze(0).expand(num_views, -1, -1, -1)
+                else:
+                    triangles = (pos_camera[..., :3] / pos_camera[..., 3:4])[:, self.pos_idx[:, :3], :]
+                face_normals = F.normalize(
+                    torch.cross(
+                        triangles[..., 1, :] - triangles[..., 0, :], triangles[..., 2, :] - triangles[..., 0, :], dim=-1
+                    ),
+                    dim=-1,
+                )
+
+                if self.shader_type == "vertex":
+                    vertex_normals = torch.stack([
+                        torch.from_numpy(
+                            trimesh.geometry.mean_vertex_normals(
+                                vertex_count=self.vtx_pos.shape[0],
+                                faces=self.pos_idx.cpu(),
+                                face_normals=view_face_normals.cpu(),
+                            )
+                        ).float()
+                        for view_face_normals in face_normals
+                    ]).to(self.device)
+                    content = self._interpolate_views(vertex_normals, rast_out, self.pos_idx)
+                elif self.shader_type == "face":
+                    tri_ids = rast_out[..., 3]
+                    tri_ids_mask = (tri_ids > 0).unsqueeze(-1)
+                    tri_ids = ((tri_ids - 1) * (tri_ids > 0)).long()
+                    view_idx = torch.arange(num_views, device=tri_ids.device).view(-1, 1, 1)
+                    content = face_normals[view_idx, tri_ids] * tri_ids_mask
+            elif mode == RenderMode.POSITION:
+                tex_position = 0.5 - self.vtx_pos[:, :3] / self.scale_factor
+                content = self._interpolate_views(tex_position.unsqueeze(0).expand(num_views, -1, -1), rast_out, self.pos_idx)
+
+            result = _apply_background_mask(content, visible_mask, bg_color, self.device)
+            if mode == RenderMode.NORMAL and kwargs.get('normalize_rgb', True):
+                result = (result + 1) * 0.5
+            if self.use_antialias:
+                result = self.raster_antialias(result, rast_out, pos_clip, self.pos_idx)
+            results.append(result)
+        return torch.cat(results, dim=0)
+
     def set_orth_scale(self, ortho_scale):
         """
         Set the orthographic projection scale and update camera projection matrix.
@@ -542,6 +814,33 @@ class MeshRender:
 
         return rast_out, rast_out_db
 
+    def raster_rasterize_batch(self, pos, tri, resolution):
+        """
+        Rasterize a stack of views of the mesh in a single backend call.
+
+        Args:
+            pos: Vertex positions in clip space for every view [V, N, 4]
+            tri: Triangle indices
+            resolution: Rendering resolution [height, width]
+
+        Returns:
+            Tuple of (rasterization_output [V, H, W, 4], gradient_info)
+        """
+
+        if self.raster_mode == "cr":
+            rast_out_db = None
+            if pos.dtype == torch.float64:
+                pos = pos.to(torch.float32)
+            if tri.dtype == torch.int64:
+                tri = tri.to(torch.int32)
+
+            findices, barycentric = self.raster.rasterize_batch(pos, tri, resolution)
+            rast_out = torch.cat((barycentric, findices.unsqueeze(-1)), dim=-1)
+        else:
+            raise ValueError(f"No raster named {self.raster_mode}")
+
+        return rast_out, rast_out_db
+
     def raster_interpolate(self, uv, rast_out, uv_idx):
         """
         Interpolate texture coordinates or vertex attributes across rasterized triangles.
@@ -622,33 +921,44 @@ class MeshRender:
         if texture_data is not None:
             self.set_texture(texture_data)
 
-    def save_mesh(self, mesh_path, downsample=False):
+    def _get_export_textures(self, downsample=False, texture_size=None):
+        """
+        Get the textures to export, optionally downsampled by half or resized to `texture_size`.
+
+        Returns:
+            Tuple of (diffuse, metallic, roughness, normal) numpy arrays, missing maps are None
+        """
+        textures = (self.get_texture(), *self.get_texture_mr(), self.get_texture_normal())
+        if downsample:
+            # halve each map with the cv2 default (bilinear) interpolation, as exports always have
+            return tuple(
+                None if texture is None else cv2.resize(texture, (texture.shape[1] // 2, texture.shape[0] // 2))
+                for texture in textures
+            )
+        if texture_size is None:
+            return textures
+        height, width = _ensure_resolution_format(texture_size, None)
+        return tuple(
+            texture
+            if texture is None or texture.shape[:2] == (height, width)
+            else cv2.resize(texture, (width, height), interpolation=cv2.INTER_AREA)
+            for texture in textures
+        )
+
+    def save_mesh(self, mesh_path, downsample=False, texture_size=None):
         """
         Save current mesh with textures to file.
         
         Args:
             mesh_path: Output file path
             downsample: Whether to downsample textures by half
+            texture_size: Size to export the textures at, int (square) or (height, width), if not downsampling
         """
 
         vtx_pos, pos_idx, vtx_uv, uv_idx = self.get_mesh(normalize=False)
-        texture_data = self.get_texture()
-        texture_metallic, texture_roughness = self.get_texture_mr()
-        texture_normal = self.get_texture_normal()
-        if downsample:
-            texture_data = cv2.resize(texture_data, (texture_data.shape[1] // 2, texture_data.shape[0] // 2))
-            if texture_metallic is not None:
-                texture_metallic = cv2.resize(
-                    texture_metallic, (texture_metallic.shape[1] // 2, texture_metallic.shape[0] // 2)
-                )
-            if texture_roughness is not None:
-                texture_roughness = cv2.resize(
-                    texture_roughness, (texture_roughness.shape[1] // 2, texture_roughness.shape[0] // 2)
-                )
-            if texture_normal is not None:
-                texture_normal = cv2.resize(
-                    texture_normal, (texture_normal.shape[1] // 2, texture_normal.shape[0] // 2)
-                )
+        texture_data, texture_metallic, texture_roughness, texture_normal = self._get_export_textures(
+            downsample, texture_size
+        )
 
         save_mesh(
             mesh_path,
@@ -662,6 +972,32 @@ class MeshRender:
             normal=texture_normal,
         )
 
+    def get_textured_mesh(self, downsample=False, texture_size=None):
+        """
+        Get current mesh with textures as an in-memory trimesh, without touching the disk.
+
+        Args:
+            downsample: Whether to downsample textures by half
+            texture_size: Size to export the textures at, int (square) or (height, width), if not downsampling
+
+        Returns:
+            trimesh.Trimesh with a PBR material
+        """
+        vtx_pos, pos_idx, vtx_uv, uv_idx = self.get_mesh(normalize=False)
+        texture_data, texture_metallic, texture_roughness, texture_normal = self._get_export_textures(
+            downsample, texture_size
+        )
+        return to_textured_trimesh(
+            vtx_pos,
+            pos_idx,
+            vtx_uv,
+            uv_idx,
+            texture_data,
+            metallic=texture_metallic,
+            roughness=texture_roughness,
+            normal=texture_normal,
+        )
+
     def set_mesh(self, vtx_pos, pos_idx, vtx_uv=None, uv_idx=None, scale_factor=1.15, auto_center=True):
         """
         Set mesh geometry data and perform coordinate transformations.
@@ -674,6 +1010,10 @@ class MeshRender:
             scale_factor: Scaling factor for mesh normalization
             auto_center: Whether to automatically center and scale the mesh
         """
+        # views rasterized for the previous mesh are stale
+        self._raster_cache_scope = uuid.uuid4().hex
+        self.clear_raster_cache()
+
         self.vtx_pos = torch.from_numpy(vtx_pos).to(self.device)
         self.pos_idx = torch.from_numpy(pos_idx).to(self.device)
 
@@ -884,6 +1224,7 @@ class MeshRender:
             device: Target device ("cuda", "cpu", etc.)
         """
         self.device = device
+        self.clear_raster_cache()
 
         for attr_name in dir(self):
             attr_value = getattr(self, attr_name)
@@ -1041,6 +1382,33 @@ class MeshRender:
             raise Exception("PIL format not supported for alpha rendering")
         return _format_output(image, return_type)
 
+    def render_normal_multiview(self, elevs, azims, camera_distance=None, center=None, resolution=None,
+                                bg_color=[1, 1, 1], use_abs_coor=False, normalize_rgb=True, return_type="th",
+                                supersample=1):
+        """Render surface normals from several viewpoints with batched rasterization, returns one image per view."""
+        images = self._render_views_pipeline(
+            elevs, azims, RenderMode.NORMAL, camera_distance, center, resolution, bg_color,
+            supersample=supersample, use_abs_coor=use_abs_coor, normalize_rgb=normalize_rgb,
+        )
+        return [_format_output(image, return_type) for image in images]
+
+    def render_position_multiview(self, elevs, azims, camera_distance=None, center=None, resolution=None,
+                                  bg_color=[1, 1, 1], return_type="th", supersample=1):
+        """Render world-space positions from several viewpoints with batched rasterization."""
+        images = self._render_views_pipeline(
+            elevs, azims, RenderMode.POSITION, camera_distance, center, resolution, bg_color,
+            supersample=supersample,
+        )
+        return [_format_output(image, return_type) for image in images]
+
+    def render_alpha_multiview(self, elevs, azims, camera_distance=None, center=None, resolution=None,
+                               return_type="th"):
+        """Render face index masks from several viewpoints with batched rasterization, [V, H, W, 1] for "th"."""
+        images = self._render_views_pipeline(elevs, azims, RenderMode.ALPHA, camera_distance, center, resolution)
+        if return_type == ReturnType.PIL.value:
+            raise Exception("PIL format not supported for alpha rendering")
+        return _format_output(images, return_type)
+
     def uv_feature_map(self, vert_feat, bg=None):
         """
         Map per-vertex features to UV texture space using mesh topology.
@@ -1126,28 +1494,47 @@ class MeshRender:
         Returns:
             Tuple of (texture, cosine_map, boundary_map) tensors in UV space
         """
+        image = self.prepare_bake_image(image)
+        geometry = self.back_project_geometry(
+            elev, azim, image.shape[:2], camera_distance=camera_distance, center=center, method=method
+        )
+        texture = self.back_project_image(image, geometry)
+        return texture, geometry["cos_map"], geometry["boundary_map"]
 
+    def prepare_bake_image(self, image):
+        """Convert an image to back-project into a float [H, W, C] tensor on the render device."""
         if isinstance(image, Image.Image):
             image = torch.tensor(np.array(image) / 255.0)
         elif isinstance(image, np.ndarray):
             image = torch.tensor(image)
         if image.dim() == 2:
             image = image.unsqueeze(-1)
-        image = image.float().to(self.device)
-        resolution = image.shape[:2]
-        channel = image.shape[-1]
-        texture = torch.zeros(self.texture_size + (channel,)).to(self.device)
-        cos_map = torch.zeros(self.texture_size + (1,)).to(self.device)
+        return image.float().to(self.device)
+
+    def back_project_geometry(self, elev, azim, resolution, camera_distance=None, center=None, method=None):
+        """
+        Compute the image independent part of back-projection for one view.
 
+        Rasterization, visibility, sketch and shrink convolutions and cosine maps only depend on the
+        mesh and the camera, so they are computed once and reused by `back_project_image` for every
+        channel (albedo, metallic-roughness, ...) baked from the same view.
+
+        Args:
+            elev: Camera elevation angle in degrees used for rendering
+            azim: Camera azimuth angle in degrees used for rendering
+            resolution: Resolution (height, width) of the images to back-project
+            camera_distance: Camera distance (uses default if None)
+            center: Camera focus center (uses origin if None)
+            method: Back-projection method ("linear", "mip-map", "back_sample", uses default if None)
+
+        Returns:
+            Dict with the sampling data of the method, and the "cos_map" and "boundary_map" in UV space
+        """
+        resolution = tuple(resolution)
         proj = self.camera_proj_mat
-        r_mv = get_mv_matrix(
-            elev=elev,
-            azim=azim,
-            camera_distance=self.camera_distance if camera_distance is None else camera_distance,
-            center=center,
-        )
-        pos_camera = transform_pos(r_mv, self.vtx_pos, keepdim=True)
-        pos_clip = transform_pos(proj, pos_camera)
+        entry = self._get_view_raster(elev, azim, camera_distance, center, resolution)
+        r_mv = entry["r_mv"]
+        pos_camera = entry["pos_camera"]
         pos_camera = pos_camera[:, :3] / pos_camera[:, 3:4]
 
         v0 = pos_camera[self.pos_idx[:, 0], :]
@@ -1156,7 +1543,7 @@ class MeshRender:
         face_normals = F.normalize(torch.cross(v1 - v0, v2 - v0, dim=-1), dim=-1)
 
         tex_depth = pos_camera[:, 2].reshape(1, -1, 1).contiguous()
-        rast_out, rast_out_db = self.raster_rasterize(pos_clip, self.pos_idx, resolution=resolution)
+        rast_out = entry["rast_out"]
         visible_mask = torch.clamp(rast_out[..., -1:], 0, 1)[0, ...]
 
         if self.shader_type == "vertex":
@@ -1166,7 +1553,7 @@ class MeshRender:
                 face_normals=face_normals.cpu(),
             )
             vertex_normals = torch.from_numpy(vertex_normals).float().to(self.device).contiguous()
-            normal, _ = self.raster_interpolate(vertex_normals[None, ...], rast_out, self.pos_idx)
+            normal = self._interpolate_view_attr(entry, "vertex_normal_camera", vertex_normals[None, ...], self.pos_idx)
         elif self.shader_type == "face":
             tri_ids = rast_out[..., 3]
             tri_ids_mask = tri_ids > 0
@@ -1175,8 +1562,8 @@ class MeshRender:
             normal.reshape(-1, 3)[tri_ids_mask.view(-1)] = face_normals.reshape(-1, 3)[tri_ids[tri_ids_mask].view(-1)]
 
         normal = normal[0, ...]
-        uv, _ = self.raster_interpolate(self.vtx_uv[None, ...], rast_out, self.uv_idx)
-        depth, _ = self.raster_interpolate(tex_depth, rast_out, self.pos_idx)
+        uv = self._interpolate_view_attr(entry, "uv", self.vtx_uv[None, ...], self.uv_idx)
+        depth = self._interpolate_view_attr(entry, "depth", tex_depth, self.pos_idx)
         depth = depth[0, ...]
 
         depth_max, depth_min = depth[visible_mask > 0].max(), depth[visible_mask > 0].min()
@@ -1211,26 +1598,27 @@ class MeshRender:
         cos_image[visible_mask == 0] = 0
 
         method = self.bake_mode if method is None else method
+        geometry = {"method": method, "resolution": resolution}
 
         if method == "linear":
             proj_mask = (visible_mask != 0).view(-1)
             uv = uv.squeeze(0).contiguous().view(-1, 2)[proj_mask]
-            image = image.squeeze(0).contiguous().view(-1, channel)[proj_mask]
             cos_image = cos_image.contiguous().view(-1, 1)[proj_mask]
             sketch_image = sketch_image.contiguous().view(-1, 1)[proj_mask]
 
-            texture = linear_grid_put_2d(self.texture_size[1], self.texture_size[0], uv[..., [1, 0]], image)
-            cos_map = linear_grid_put_2d(self.texture_size[1], self.texture_size[0], uv[..., [1, 0]], cos_image)
-            boundary_map = linear_grid_put_2d(self.texture_size[1], self.texture_size[0], uv[..., [1, 0]], sketch_image)
+            geometry["proj_mask"] = proj_mask
+            geometry["uv"] = uv
+            geometry["cos_map"] = linear_grid_put_2d(
+                self.texture_size[1], self.texture_size[0], uv[..., [1, 0]], cos_image
+            )
+            geometry["boundary_map"] = linear_grid_put_2d(
+                self.texture_size[1], self.texture_size[0], uv[..., [1, 0]], sketch_image
+            )
         elif method == "mip-map":
             proj_mask = (visible_mask != 0).view(-1)
             uv = uv.squeeze(0).contiguous().view(-1, 2)[proj_mask]
-            image = image.squeeze(0).contiguous().view(-1, channel)[proj_mask]
             cos_image = cos_image.contiguous().view(-1, 1)[proj_mask]
 
-            texture = mipmap_linear_grid_put_2d(
-                self.texture_size[1], self.texture_size[0], uv[..., [1, 0]], image, min_resolution=128
-            )
             cos_map = mipmap_linear_grid_put_2d(
                 self.texture_size[1], self.texture_size[0], uv[..., [1, 0]], cos_image, min_resolution=256
             )
@@ -1245,6 +1633,11 @@ class MeshRender:
             cos_map_uv[cos_map_uv < cos_thres] = 0
             # cos_map = torch.min(cos_map, cos_map_uv)
             cos_map[cos_map_uv < cos_thres] = 0
+
+            geometry["proj_mask"] = proj_mask
+            geometry["uv"] = uv
+            geometry["cos_map"] = cos_map
+            geometry["boundary_map"] = None
         elif method == "back_sample":
 
             img_proj = torch.from_numpy(
@@ -1279,40 +1672,77 @@ class MeshRender:
             sampled_b = sketch_image.reshape(-1)[indices]
             sampled_w = sampled_w[valid_idx]
 
-            # bilinear sampling rgb
+            # bilinear sampling weights and neighbours
             wx = ((v_proj[:, 0] * 0.5 + 0.5) * resolution[0] - img_x)[valid_idx].reshape(-1, 1)
             wy = ((v_proj[:, 1] * 0.5 + 0.5) * resolution[1] - img_y)[valid_idx].reshape(-1, 1)
             img_x = img_x[valid_idx]
             img_y = img_y[valid_idx]
             img_x_r = torch.clamp(img_x + 1, 0, resolution[0] - 1)
             img_y_r = torch.clamp(img_y + 1, 0, resolution[1] - 1)
-            indices_lr = img_y * resolution[0] + img_x_r
-            indices_rl = img_y_r * resolution[0] + img_x
-            indices_rr = img_y_r * resolution[0] + img_x_r
-            rgb = image.reshape(-1, channel)
-            sampled_rgb = (rgb[indices] * (1 - wx) + rgb[indices_lr] * wx) * (1 - wy) + (
-                rgb[indices_rl] * (1 - wx) + rgb[indices_rr] * wx
-            ) * wy
 
-            # return sampled_rgb, sampled_w, sampled_b, valid_idx
-            texture = torch.zeros(self.texture_size[0], self.texture_size[1], channel, device=self.device).reshape(
-                -1, channel
-            )
             cos_map = torch.zeros(self.texture_size[0], self.texture_size[1], 1, device=self.device).reshape(-1)
             boundary_map = torch.zeros(self.texture_size[0], self.texture_size[1], 1, device=self.device).reshape(-1)
 
             valid_tex_indices = self.tex_grid[valid_idx, 0] * self.texture_size[1] + self.tex_grid[valid_idx, 1]
-            texture[valid_tex_indices, :] = sampled_rgb
             cos_map[valid_tex_indices] = sampled_w
             boundary_map[valid_tex_indices] = sampled_b
 
+            geometry["indices"] = indices
+            geometry["indices_lr"] = img_y * resolution[0] + img_x_r
+            geometry["indices_rl"] = img_y_r * resolution[0] + img_x
+            geometry["indices_rr"] = img_y_r * resolution[0] + img_x_r
+            geometry["wx"] = wx
+            geometry["wy"] = wy
+            geometry["valid_tex_indices"] = valid_tex_indices
+            geometry["cos_map"] = cos_map.view(self.texture_size[0], self.texture_size[1], 1)
+            geometry["boundary_map"] = boundary_map.view(self.texture_size[0], self.texture_size[1], 1)
+
+        else:
+            raise f"No bake mode {method}"
+        return geometry
+
+    def back_project_image(self, image, geometry):
+        """
+        Back-project one image through precomputed view geometry.
+
+        Args:
+            image: Input image to back-project (PIL Image, numpy array, or tensor) at the geometry resolution
+            geometry: Result of `back_project_geometry` for the view the image was rendered from
+
+        Returns:
+            Texture tensor in UV space
+        """
+        image = self.prepare_bake_image(image)
+        channel = image.shape[-1]
+        method = geometry["method"]
+
+        if method == "linear":
+            image = image.squeeze(0).contiguous().view(-1, channel)[geometry["proj_mask"]]
+            texture = linear_grid_put_2d(
+                self.texture_size[1], self.texture_size[0], geometry["uv"][..., [1, 0]], image
+            )
+        elif method == "mip-map":
+            image = image.squeeze(0).contiguous().view(-1, channel)[geometry["proj_mask"]]
+            texture = mipmap_linear_grid_put_2d(
+                self.texture_size[1], self.texture_size[0], geometry["uv"][..., [1, 0]], image, min_resolution=128
+            )
+        elif method == "back_sample":
+            # bilinear sampling rgb
+            wx, wy = geometry["wx"], geometry["wy"]
+            rgb = image.reshape(-1, channel)
+            sampled_rgb = (rgb[geometry["indices"]] * (1 - wx) + rgb[geometry["indices_lr"]] * wx) * (1 - wy) + (
+                rgb[geometry["indices_rl"]] * (1 - wx) + rgb[geometry["indices_rr"]] * wx
+            ) * wy
+
+            texture = torch.zeros(self.texture_size[0], self.texture_size[1], channel, device=self.device).reshape(
+                -1, channel
+            )
+            texture[geometry["valid_tex_indices"], :] = sampled_rgb
             texture = texture.view(self.texture_size[0], self.texture_size[1], channel)
-            cos_map = cos_map.view(self.texture_size[0], self.texture_size[1], 1)
             # texture = torch.clamp(texture,0,1)
-
         else:
             raise f"No bake mode {method}"
-        return texture, cos_map, boundary_map
+        return texture
 
     def bake_texture(self, colors, elevs, azims, camera_distance=None, center=None, exp=6, weights=None):
         """
@@ -1363,19 +1793,94 @@ class MeshRender:
             Tuple of (merged_texture, valid_mask) tensors
         """
 
-        channel = textures[0].shape[-1]
-        texture_merge = torch.zeros(self.texture_size + (channel,)).to(self.device)
-        trust_map_merge = torch.zeros(self.texture_size + (1,)).to(self.device)
+        accumulator = self.bake_accumulator(textures[0].shape[-1])
         for texture, cos_map in zip(textures, cos_maps):
-            view_sum = (cos_map > 0).sum()
-            painted_sum = ((cos_map > 0) * (trust_map_merge > 0)).sum()
-            if painted_sum / view_sum > 0.99:
-                continue
-            texture_merge += texture * cos_map
-            trust_map_merge += cos_map
-        texture_merge = texture_merge / torch.clamp(trust_map_merge, min=1e-8)
+            accumulator.add(texture, cos_map)
+        return accumulator.result()
+
+    def bake_accumulator(self, channel):
+        """
+        Create an incremental texture merger for views baked one by one.
+
+        Args:
+            channel: Number of texture channels
+
+        Returns:
+            TextureBakeAccumulator at the current texture resolution
+        """
+        return TextureBakeAccumulator(self.texture_size, channel, self.device)
+
+    def _mesh_vertex_colors(self, texture, mask):
+        """
+        Per UV vertex colors read from the painted texels, the torch counterpart of `meshVerticeInpaint`.
+
+        Vertices on unpainted texels get the mean color of their painted neighbours, propagated ring by
+        ring over the connectivity of the position vertices so that colors cross UV seams.
+
+        Returns:
+            Tuple of (colors [N_uv, C], valid [N_uv]), vertices of surfaces without any painted texel are invalid
+        """
+        height, width = mask.shape
+        pos_idx, uv_idx = self.pos_idx.long(), self.uv_idx.long()
+        rows = (self.vtx_uv[:, 1] * (height - 1)).round().long().clamp(0, height - 1)
+        cols = (self.vtx_uv[:, 0] * (width - 1)).round().long().clamp(0, width - 1)
+        uv_colors = texture[rows, cols].float()
+        uv_valid = mask[rows, cols]
+
+        corner_pos, corner_uv = pos_idx.reshape(-1), uv_idx.reshape(-1)
+        corner_weight = uv_valid[corner_uv].float()
+        num_vertices, channel = self.vtx_pos.shape[0], texture.shape[-1]
+        color_sum = torch.zeros(num_vertices, channel, device=self.device).index_add_(
+            0, corner_pos, uv_colors[corner_uv] * corner_weight[:, None]
+        )
+        count = torch.zeros(num_vertices, device=self.device).index_add_(0, corner_pos, corner_weight)
+        colors = color_sum / count.clamp(min=1)[:, None]
+        valid = count > 0
+
+        edges = torch.cat([pos_idx[:, [0, 1]], pos_idx[:, [1, 2]], pos_idx[:, [2, 0]]])
+        src, dst = torch.cat([edges[:, 0], edges[:, 1]]), torch.cat([edges[:, 1], edges[:, 0]])
+        while True:
+            src_weight = valid[src].float()
+            neighbour_sum = torch.zeros_like(colors).index_add_(0, dst, colors[src] * src_weight[:, None])
+            neighbour_count = torch.zeros_like(count).index_add_(0, dst, src_weight)
+            reached = ~valid & (neighbour_count > 0)
+            if not bool(reached.any()):
+                break
+            colors[reached] = neighbour_sum[reached] / neighbour_count[reached][:, None]
+            valid |= reached
+
+        # UV vertices on painted texels keep their own color, the others take the one of their position vertex
+        uv_to_pos = torch.zeros_like(uv_valid, dtype=torch.long).scatter_(0, corner_uv, corner_pos)
+        uv_colors = torch.where(uv_valid[:, None], uv_colors, colors[uv_to_pos])
+        return uv_colors, uv_valid | valid[uv_to_pos]
+
+    @torch.no_grad()
+    def uv_inpaint_pull_push(self, texture, mask, vertex_inpaint=True):
+        """
+        Inpaint missing regions in UV texture on the texture device.
 
-        return texture_merge, trust_map_merge > 1e-8
+        Holes inside UV charts are first seeded with the vertex colors of `_mesh_vertex_colors` interpolated
+        over the faces, then the remaining texels (chart gutters and unseeded holes) are filled by
+        `pull_push_inpaint`.
+
+        Args:
+            texture: Input texture tensor [H, W, C] in [0, 1]
+            mask: Boolean tensor [H, W] of the painted texels to keep
+            vertex_inpaint: Whether to seed the holes with mesh vertex colors
+
+        Returns:
+            Inpainted float texture tensor [H, W, C]
+        """
+        texture = texture.float().to(self.device)
+        mask = mask.to(self.device)
+        if vertex_inpaint:
+            uv_colors, uv_valid = self._mesh_vertex_colors(texture, mask)
+            seed = self.uv_feature_map(torch.cat([uv_colors, uv_valid.float()[:, None]], dim=-1), bg=0)
+            # only texels whose three face corners have a color, so unreached vertices never blend in as black
+            seeded = ~mask & (seed[..., -1] > 0.999)
+            texture = torch.where(seeded[..., None], seed[..., :-1], texture)
+            mask = mask | seeded
+        return pull_push_inpaint(texture, mask)
 
     @torch.no_grad()
     def uv_inpaint(self, texture, mask, vertex_inpaint=True, method="NS", return_float=False):
@@ -0,0 +1,60 @@
+# Hunyuan 3D is licensed under the TENCENT HUNYUAN NON-COMMERCIAL LICENSE AGREEMENT
+# except for the third-party components listed below.
+# Hunyuan 3D does not impose any additional limitations beyond what is outlined
+# in the repsective licenses of these third-party components.
+# Users must comply with all terms and conditions of original licenses of these third-party
+# components and must ensure that the usage of the third party components adheres to
+# all relevant laws and regulations.
+
+# For avoidance of doubts, Hunyuan 3D means the large language models and
+# their software and algorithms, including trained model weights, parameters (including
+# optimizer states), machine-learning model code, inference-enabling code, training-enabling code,
+# fine-tuning enabling code and other elements of the foregoing made publicly available
+# by Tencent in accordance with TENCENT HUNYUAN COMMUNITY LICENSE AGREEMENT.
+
+# In-memory textured meshes, kept apart from `mesh_utils` so they do not depend on bpy
+
+import numpy as np
+import trimesh
+from PIL import Image
+
+
+def _to_pil_texture(texture: np.ndarray, grayscale: bool = False):
+    """Convert a float texture in [0, 1] to a PIL image."""
+    texture = (np.clip(texture, 0.0, 1.0) * 255).astype(np.uint8)
+    if grayscale and texture.ndim == 3:
+        texture = texture[..., 0]
+    return Image.fromarray(texture)
+
+
+def to_textured_trimesh(vtx_pos, pos_idx, vtx_uv, uv_idx, texture, metallic=None, roughness=None, normal=None):
+    """Build an in-memory `trimesh.Trimesh` with a PBR material, the counterpart of `save_mesh`."""
+    vtx_pos = np.asarray(vtx_pos, dtype=np.float32)
+    vtx_uv = np.asarray(vtx_uv, dtype=np.float32)
+    pos_idx = np.asarray(pos_idx, dtype=np.int32)
+    uv_idx = np.asarray(uv_idx, dtype=np.int32)
+
+    # trimesh stores one uv per vertex, so split vertices whose corners use several uvs
+    if not np.array_equal(pos_idx, uv_idx):
+        corners = np.stack([pos_idx.reshape(-1), uv_idx.reshape(-1)], axis=1)
+        corners, inverse = np.unique(corners, axis=0, return_inverse=True)
+        vtx_pos, vtx_uv = vtx_pos[corners[:, 0]], vtx_uv[corners[:, 1]]
+        pos_idx = inverse.reshape(-1, 3).astype(np.int32)
+
+    metallic_roughness = None
+    if metallic is not None and roughness is not None:
+        # glTF packs roughness in G and metallic in B
+        metallic_roughness = np.ones(metallic.shape[:2] + (3,), dtype=np.float32)
+        metallic_roughness[..., 1] = roughness[..., 0]
+        metallic_roughness[..., 2] = metallic[..., 0]
+        metallic_roughness = _to_pil_texture(metallic_roughness)
+
+    material = trimesh.visual.material.PBRMaterial(
+        baseColorTexture=_to_pil_texture(texture),
+        metallicRoughnessTexture=metallic_roughness,
+        normalTexture=_to_pil_texture(normal) if normal is not None else None,
+        metallicFactor=1.0 if metallic_roughness is not None else 0.0,
+        roughnessFactor=1.0,
+    )
+    visual = trimesh.visual.TextureVisuals(uv=vtx_uv, material=material)
+    return trimesh.Trimesh(vertices=vtx_pos, faces=pos_idx, visual=visual, process=False)
@@ -24,6 +24,15 @@ def rasterize(pos, tri, resolution, clamp_depth=torch.zeros(0), use_depth_prior=
     return findices, barycentric
 
 
+def rasterize_batch(pos, tri, resolution, clamp_depth=torch.zeros(0), use_depth_prior=0):
+    """Rasterize a stack of views of one mesh, pos is [V, N, 4] and the outputs are [V, H, W] and [V, H, W, 3]."""
+    assert pos.device == tri.device
+    findices, barycentric = custom_rasterizer_kernel.rasterize_image_batch(
+        pos.contiguous(), tri, clamp_depth, resolution[1], resolution[0], 1e-6, use_depth_prior
+    )
+    return findices, barycentric
+
+
 def interpolate(col, findices, barycentric, tri):
     f = findices - 1 + (findices == 0)
     vcol = col[0, tri.long()[f.long()]]
@@ -1,27 +1,28 @@
 #include "rasterizer.h"
+#include <ATen/Parallel.h>
 
-void rasterizeTriangleCPU(int idx, float* vt0, float* vt1, float* vt2, int width, int height, INT64* zbuffer, float* d, float occlusion_truncation) {
+// CPU rasterization is tiled: faces are binned by screen-space bounding box into RASTER_TILE_SIZE^2 tiles,
+// and each tile is z-tested by a single task, so tiles run in parallel without atomics. Every pixel sees
+// the same faces as a serial pass and keeps the minimum depth token, so the output is bit-identical.
+#define RASTER_TILE_SIZE 32
+
+void rasterizeTriangleTileCPU(int idx, float* vt0, float* vt1, float* vt2, int x_begin, int x_end, int y_begin, int y_end,
+    int width, INT64* zbuffer, float* d, float occlusion_truncation) {
     float x_min = std::min(vt0[0], std::min(vt1[0],vt2[0]));
     float x_max = std::max(vt0[0], std::max(vt1[0],vt2[0]));
     float y_min = std::min(vt0[1], std::min(vt1[1],vt2[1]));
     float y_max = std::max(vt0[1], std::max(vt1[1],vt2[1]));
 
-    for (int px = x_min; px < x_max + 1; ++px) {
-        if (px < 0 || px >= width)
-            continue;
-        for (int py = y_min; py < y_max + 1; ++py) {
-            if (py < 0 || py >= height)
-                continue;
+    // pixels are visited from the truncated bounding box minimum, clipped to the tile
+    int px_begin = std::max(x_begin, x_min < 0 ? 0 : (int)x_min);
+    int py_begin = std::max(y_begin, y_min < 0 ? 0 : (int)y_min);
+    for (int px = px_begin; px < x_end && px < x_max + 1; ++px) {
+        for (int py = py_begin; py < y_end && py < y_max + 1; ++py) {
             float vt[2] = {px + 0.5, py + 0.5};
             float baryCentricCoordinate[3];
             calculateBarycentricCoordinate(vt0, vt1, vt2, vt, baryCentricCoordinate);
             if (isBarycentricCoordInBounds(baryCentricCoordinate)) {
                 int pixel = py * width + px;
-                if (zbuffer == 0) {
-                    zbuffer[pixel] = (INT64)(idx + 1);
-                    continue;
-                }
-
                 float depth = baryCentricCoordinate[0] * vt0[2] + baryCentricCoordinate[1] * vt1[2] + baryCentricCoordinate[2] * vt2[2];
                 float depth_thres = 0;
                 if (d) {
@@ -78,17 +79,60 @@ void barycentricFromImgcoordCPU(float* V, int* F, int* findices, INT64* zbuffer,
     barycentric_map[pix * 3 + 2] = barycentric[2];
 }
 
-void rasterizeImagecoordsKernelCPU(float* V, int* F, float* d, INT64* zbuffer, float occlusion_trunc, int width, int height, int num_vertices, int num_faces, int f)
+void projectVerticesCPU(float* V, float* screen, int width, int height, int num_vertices)
 {
-    float* vt0_ptr = V + (F[f * 3] * 4);
-    float* vt1_ptr = V + (F[f * 3 + 1] * 4);
-    float* vt2_ptr = V + (F[f * 3 + 2] * 4);
-
-    float vt0[3] = {(vt0_ptr[0] / vt0_ptr[3] * 0.5f + 0.5f) * (width - 1) + 0.5f, (0.5f + 0.5f * vt0_ptr[1] / vt0_ptr[3]) * (height - 1) + 0.5f, vt0_ptr[2] / vt0_ptr[3] * 0.49999f + 0.5f};
-    float vt1[3] = {(vt1_ptr[0] / vt1_ptr[3] * 0.5f + 0.5f) * (width - 1) + 0.5f, (0.5f + 0.5f * vt1_ptr[1] / vt1_ptr[3]) * (height - 1) + 0.5f, vt1_ptr[2] / vt1_ptr[3] * 0.49999f + 0.5f};
-    float vt2[3] = {(vt2_ptr[0] / vt2_ptr[3] * 0.5f + 0.5f) * (width - 1) + 0.5f, (0.5f + 0.5f * vt2_ptr[1] / vt2_ptr[3]) * (height - 1) + 0.5f, vt2_ptr[2] / vt2_ptr[3] * 0.49999f + 0.5f};
+    at::parallel_for(0, num_vertices, 2048, [&](int64_t begin, int64_t end) {
+        for (int64_t i = begin; i < end; ++i) {
+            float* vt_ptr = V + i * 4;
+            screen[i * 3] = (vt_ptr[0] / vt_ptr[3] * 0.5f + 0.5f) * (width - 1) + 0.5f;
+            screen[i * 3 + 1] = (0.5f + 0.5f * vt_ptr[1] / vt_ptr[3]) * (height - 1) + 0.5f;
+            screen[i * 3 + 2] = vt_ptr[2] / vt_ptr[3] * 0.49999f + 0.5f;
+        }
+    });
+}
 
-    rasterizeTriangleCPU(f, vt0, vt1, vt2, width, height, zbuffer, d, occlusion_trunc);
+void binFacesCPU(float* screen, int* F, int width, int height, int num_faces, int tiles_x, int tiles_y,
+    std::vector<int>& tile_offsets, std::vector<int>& tile_faces)
+{
+    // tile range of every face, conservative with respect to the pixel loop of rasterizeTriangleTileCPU
+    std::vector<int> face_tiles(num_faces * 4, -1);
+    std::vector<int> tile_counts(tiles_x * tiles_y + 1, 0);
+    for (int f = 0; f < num_faces; ++f) {
+        float* vt0 = screen + F[f * 3] * 3;
+        float* vt1 = screen + F[f * 3 + 1] * 3;
+        float* vt2 = screen + F[f * 3 + 2] * 3;
+        float x_min = std::min(vt0[0], std::min(vt1[0],vt2[0]));
+        float x_max = std::max(vt0[0], std::max(vt1[0],vt2[0]));
+        float y_min = std::min(vt0[1], std::min(vt1[1],vt2[1]));
+        float y_max = std::max(vt0[1], std::max(vt1[1],vt2[1]));
+        // also rejects faces with non finite coordinates, which cover no pixel
+        if (!(x_max + 1 > 0 && y_max + 1 > 0 && x_min < width && y_min < height))
+            continue;
+        int x0 = x_min < 0 ? 0 : (int)x_min;
+        int y0 = y_min < 0 ? 0 : (int)y_min;
+        int x1 = x_max + 1 >= width ? width - 1 : (int)(x_max + 1);
+        int y1 = y_max + 1 >= height ? height - 1 : (int)(y_max + 1);
+        int* range = &face_tiles[f * 4];
+        range[0] = x0 / RASTER_TILE_SIZE;
+        range[1] = x1 / RASTER_TILE_SIZE;
+        range[2] = y0 / RASTER_TILE_SIZE;
+        range[3] = y1 / RASTER_TILE_SIZE;
+        for (int ty = range[2]; ty <= range[3]; ++ty)
+            for (int tx = range[0]; tx <= range[1]; ++tx)
+                tile_counts[ty * tiles_x + tx + 1] += 1;
+    }
+    for (int t = 0; t < tiles_x * tiles_y; ++t)
+        tile_counts[t + 1] += tile_counts[t];
+    tile_offsets = tile_counts;
+    tile_faces.resize(tile_offsets.back());
+    for (int f = 0; f < num_faces; ++f) {
+        int* range = &face_tiles[f * 4];
+        if (range[0] < 0)
+            continue;
+        for (int ty = range[2]; ty <= range[3]; ++ty)
+            for (int tx = range[0]; tx <= range[1]; ++tx)
+                tile_faces[tile_counts[ty * tiles_x + tx]++] = f;
+    }
 }
 
 std::vector<torch::Tensor> rasterize_image_cpu(torch::Tensor V, torch::Tensor F, torch::Tensor D,
@@ -102,22 +146,43 @@ std::vector<torch::Tensor> rasterize_image_cpu(torch::Tensor V, torch::Tensor F,
     INT64 maxint = (INT64)MAXINT * (INT64)MAXINT + (MAXINT - 1);
     auto z_min = torch::ones({height, width}, INT64_options) * (long)maxint;
 
-    if (!use_depth_prior) {
-        for (int i = 0; i < num_faces; ++i) {
-            rasterizeImagecoordsKernelCPU(V.data_ptr<float>(), F.data_ptr<int>(), 0,
-                (INT64*)z_min.data_ptr<long>(), occlusion_truncation, width, height, num_vertices, num_faces, i); 
+    float* V_ptr = V.data_ptr<float>();
+    int* F_ptr = F.data_ptr<int>();
+    float* D_ptr = use_depth_prior ? D.data_ptr<float>() : 0;
+    INT64* zbuffer = (INT64*)z_min.data_ptr<long>();
+
+    std::vector<float> screen(num_vertices * 3);
+    projectVerticesCPU(V_ptr, screen.data(), width, height, num_vertices);
+
+    int tiles_x = (width + RASTER_TILE_SIZE - 1) / RASTER_TILE_SIZE;
+    int tiles_y = (height + RASTER_TILE_SIZE - 1) / RASTER_TILE_SIZE;
+    std::vector<int> tile_offsets, tile_faces;
+    binFacesCPU(screen.data(), F_ptr, width, height, num_faces, tiles_x, tiles_y, tile_offsets, tile_faces);
+
+    at::parallel_for(0, tiles_x * tiles_y, 1, [&](int64_t begin, int64_t end) {
+        for (int64_t t = begin; t < end; ++t) {
+            int x_begin = (t % tiles_x) * RASTER_TILE_SIZE;
+            int y_begin = (t / tiles_x) * RASTER_TILE_SIZE;
+            int x_end = std::min(x_begin + RASTER_TILE_SIZE, width);
+            int y_end = std::min(y_begin + RASTER_TILE_SIZE, height);
+            for (int k = tile_offsets[t]; k < tile_offsets[t + 1]; ++k) {
+                int f = tile_faces[k];
+                rasterizeTriangleTileCPU(f, screen.data() + F_ptr[f * 3] * 3, screen.data() + F_ptr[f * 3 + 1] * 3,
+                    screen.data() + F_ptr[f * 3 + 2] * 3, x_begin, x_end, y_begin, y_end,
+                    width, zbuffer, D_ptr, occlusion_truncation);
+            }
         }
-    } else {
-        for (int i = 0; i < num_faces; ++i)
-            rasterizeImagecoordsKernelCPU(V.data_ptr<float>(), F.data_ptr<int>(), D.data_ptr<float>(),
-                (INT64*)z_min.data_ptr<long>(), occlusion_truncation, width, height, num_vertices, num_faces, i);
-    }
+    });
 
     auto float_options = torch::TensorOptions().dtype(torch::kFloat32).requires_grad(false);
     auto barycentric = torch::zeros({height, width, 3}, float_options);
-    for (int i = 0; i < width * height; ++i)
-        barycentricFromImgcoordCPU(V.data_ptr<float>(), F.data_ptr<int>(),
-            findices.data_ptr<int>(), (INT64*)z_min.data_ptr<long>(), width, height, num_vertices, num_faces, barycentric.data_ptr<float>(), i);
+    int* findices_ptr = findices.data_ptr<int>();
+    float* barycentric_ptr = barycentric.data_ptr<float>();
+    at::parallel_for(0, width * height, 4096, [&](int64_t begin, int64_t end) {
+        for (int64_t i = begin; i < end; ++i)
+            barycentricFromImgcoordCPU(V_ptr, F_ptr, findices_ptr, zbuffer, width, height, num_vertices, num_faces,
+                barycentric_ptr, i);
+    });
 
     return {findices, barycentric};
 }
@@ -132,8 +197,34 @@ std::vector<torch::Tensor> rasterize_image(torch::Tensor V, torch::Tensor F, tor
         return rasterize_image_gpu(V, F, D, width, height, occlusion_truncation, use_depth_prior);
 }
 
+std::vector<torch::Tensor> rasterize_image_batch_cpu(torch::Tensor V, torch::Tensor F, torch::Tensor D,
+    int width, int height, float occlusion_truncation, int use_depth_prior)
+{
+    // every view is already rasterized with all threads, so views run one after the other
+    int num_views = V.size(0);
+    std::vector<torch::Tensor> findices(num_views), barycentric(num_views);
+    for (int i = 0; i < num_views; ++i) {
+        auto result = rasterize_image_cpu(V[i].contiguous(), F, use_depth_prior ? D[i].contiguous() : D,
+            width, height, occlusion_truncation, use_depth_prior);
+        findices[i] = result[0];
+        barycentric[i] = result[1];
+    }
+    return {torch::stack(findices), torch::stack(barycentric)};
+}
+
+std::vector<torch::Tensor> rasterize_image_batch(torch::Tensor V, torch::Tensor F, torch::Tensor D,
+    int width, int height, float occlusion_truncation, int use_depth_prior)
+{
+    int device_id = V.get_device();
+    if (device_id == -1)
+        return rasterize_image_batch_cpu(V, F, D, width, height, occlusion_truncation, use_depth_prior);
+    else
+        return rasterize_image_batch_gpu(V, F, D, width, height, occlusion_truncation, use_depth_prior);
+}
+
 PYBIND11_MODULE(TORCH_EXTENSION_NAME, m) {
   m.def("rasterize_image", &rasterize_image, "Custom image rasterization");
+  m.def("rasterize_image_batch", &rasterize_image_batch, "Custom image rasterization of a stack of views");
   m.def("build_hierarchy", &build_hierarchy, "Custom image rasterization");
   m.def("build_hierarchy_with_feat", &build_hierarchy_with_feat, "Custom image rasterization");
 }
@@ -37,12 +37,9 @@ __device__ void rasterizeTriangleGPU(int idx, float* vt0, float* vt1, float* vt2
     }
 }
 
-__global__ void barycentricFromImgcoordGPU(float* V, int* F, int* findices, INT64* zbuffer, int width, int height, int num_vertices, int num_faces,
-    float* barycentric_map)
+__device__ void barycentricFromImgcoordPixelGPU(float* V, int* F, int* findices, INT64* zbuffer, int width, int height,
+    float* barycentric_map, int pix)
 {
-    int pix = blockIdx.x * blockDim.x + threadIdx.x;
-    if (pix >= width * height)
-        return;
     INT64 f = zbuffer[pix] % MAXINT;
     if (f == (MAXINT-1)) {
         findices[pix] = 0;
@@ -80,12 +77,30 @@ __global__ void barycentricFromImgcoordGPU(float* V, int* F, int* findices, INT6
     barycentric_map[pix * 3 + 2] = barycentric[2];
 }
 
-__global__ void rasterizeImagecoordsKernelGPU(float* V, int* F, float* d, INT64* zbuffer, float occlusion_trunc, int width, int height, int num_vertices, int num_faces)
+__global__ void barycentricFromImgcoordGPU(float* V, int* F, int* findices, INT64* zbuffer, int width, int height, int num_vertices, int num_faces,
+    float* barycentric_map)
 {
-    int f = blockIdx.x * blockDim.x + threadIdx.x;
-    if (f >= num_faces)
-        return; 
+    int pix = blockIdx.x * blockDim.x + threadIdx.x;
+    if (pix >= width * height)
+        return;
+    barycentricFromImgcoordPixelGPU(V, F, findices, zbuffer, width, height, barycentric_map, pix);
+}
 
+// one view per blockIdx.y, views are stacked along the leading dimension of V, findices, zbuffer and barycentric_map
+__global__ void barycentricFromImgcoordBatchGPU(float* V, int* F, int* findices, INT64* zbuffer, int width, int height, int num_vertices, int num_faces,
+    float* barycentric_map)
+{
+    int pix = blockIdx.x * blockDim.x + threadIdx.x;
+    if (pix >= width * height)
+        return;
+    long view = blockIdx.y;
+    long num_pixels = (long)width * height;
+    barycentricFromImgcoordPixelGPU(V + view * num_vertices * 4, F, findices + view * num_pixels, zbuffer + view * num_pixels,
+        width, height, barycentric_map + view * num_pixels * 3, pix);
+}
+
+__device__ void rasterizeFaceGPU(float* V, int* F, float* d, INT64* zbuffer, float occlusion_trunc, int width, int height, int f)
+{
     float* vt0_ptr = V + (F[f * 3] * 4);
     float* vt1_ptr = V + (F[f * 3 + 1] * 4);
     float* vt2_ptr = V + (F[f * 3 + 2] * 4);
@@ -97,6 +112,25 @@ __global__ void rasterizeImagecoordsKernelGPU(float* V, int* F, float* d, INT64*
     rasterizeTriangleGPU(f, vt0, vt1, vt2, width, height, zbuffer, d, occlusion_trunc);
 }
 
+__global__ void rasterizeImagecoordsKernelGPU(float* V, int* F, float* d, INT64* zbuffer, float occlusion_trunc, int width, int height, int num_vertices, int num_faces)
+{
+    int f = blockIdx.x * blockDim.x + threadIdx.x;
+    if (f >= num_faces)
+        return; 
+    rasterizeFaceGPU(V, F, d, zbuffer, occlusion_trunc, width, height, f);
+}
+
+__global__ void rasterizeImagecoordsBatchKernelGPU(float* V, int* F, float* d, INT64* zbuffer, float occlusion_trunc, int width, int height, int num_vertices, int num_faces)
+{
+    int f = blockIdx.x * blockDim.x + threadIdx.x;
+    if (f >= num_faces)
+        return;
+    long view = blockIdx.y;
+    long num_pixels = (long)width * height;
+    rasterizeFaceGPU(V + view * num_vertices * 4, F, d ? d + view * num_pixels : 0, zbuffer + view * num_pixels,
+        occlusion_trunc, width, height, f);
+}
+
 std::vector<torch::Tensor> rasterize_image_gpu(torch::Tensor V, torch::Tensor F, torch::Tensor D,
     int width, int height, float occlusion_truncation, int use_depth_prior)
 {
@@ -125,3 +159,31 @@ std::vector<torch::Tensor> rasterize_image_gpu(torch::Tensor V, torch::Tensor F,
 
     return {findices, barycentric};
 }
+
+std::vector<torch::Tensor> rasterize_image_batch_gpu(torch::Tensor V, torch::Tensor F, torch::Tensor D,
+    int width, int height, float occlusion_truncation, int use_depth_prior)
+{
+    int device_id = V.get_device();
+    cudaSetDevice(device_id);
+    int num_views = V.size(0);
+    int num_faces = F.size(0);
+    int num_vertices = V.size(1);
+    auto options = torch::TensorOptions().dtype(torch::kInt32).device(torch::kCUDA, device_id).requires_grad(false);
+    auto INT64_options = torch::TensorOptions().dtype(torch::kInt64).device(torch::kCUDA, device_id).requires_grad(false);
+    auto findices = torch::zeros({num_views, height, width}, options);
+    INT64 maxint = (INT64)MAXINT * (INT64)MAXINT + (MAXINT - 1);
+    auto z_min = torch::ones({num_views, height, width}, INT64_options) * (long)maxint;
+
+    auto stream = at::cuda::getCurrentCUDAStream();
+    dim3 face_blocks((num_faces + 255) / 256, num_views);
+    rasterizeImagecoordsBatchKernelGPU<<<face_blocks,256,0,stream>>>(V.data_ptr<float>(), F.data_ptr<int>(),
+        use_depth_prior ? D.data_ptr<float>() : 0, (INT64*)z_min.data_ptr<long>(), occlusion_truncation, width, height, num_vertices, num_faces);
+
+    auto float_options = torch::TensorOptions().dtype(torch::kFloat32).device(torch::kCUDA, device_id).requires_grad(false);
+    auto barycentric = torch::zeros({num_views, height, width, 3}, float_options);
+    dim3 pixel_blocks((width * height + 255) / 256, num_views);
+    barycentricFromImgcoordBatchGPU<<<pixel_blocks,256,0,stream>>>(V.data_ptr<float>(), F.data_ptr<int>(),
+        findices.data_ptr<int>(), (INT64*)z_min.data_ptr<long>(), width, height, num_vertices, num_faces, barycentric.data_ptr<float>());
+
+    return {findices, barycentric};
+}
@@ -12,12 +12,59 @@
 # fine-tuning enabling code and other elements of the foregoing made publicly available
 # by Tencent in accordance with TENCENT HUNYUAN COMMUNITY LICENSE AGREEMENT.
 
+import os
+import sys
+import tempfile
+
 from setuptools import setup, find_packages
 import torch
 from torch.utils.cpp_extension import BuildExtension, CUDAExtension, CppExtension
+from distutils.ccompiler import new_compiler
+from distutils.errors import CompileError, LinkError
+from distutils.sysconfig import customize_compiler
+
+OPENMP_TEST_SOURCE = "#include <omp.h>\nint main() { return omp_get_max_threads() > 0 ? 0 : 1; }\n"
+
+
+def _supports_openmp(compile_args, link_args):
+    """Whether a test program builds with the given OpenMP flags."""
+    compiler = new_compiler()
+    customize_compiler(compiler)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, "openmp_test.c")
+        with open(source, "w") as f:
+            f.write(OPENMP_TEST_SOURCE)
+        try:
+            objects = compiler.compile([source], output_dir=tmp_dir, extra_postargs=compile_args)
+            compiler.link_executable(objects, os.path.join(tmp_dir, "openmp_test"), extra_postargs=link_args)
+        except (CompileError, LinkError):
+            return False
+    return True
+
+
+def openmp_args():
+    """
+    (cxx, nvcc, link) flags enabling OpenMP, which at::parallel_for needs (_OPENMP) to split the CPU
+    rasterizer tiles across threads. All empty, i.e. a serial build, when the toolchain has no OpenMP.
+    """
+    if sys.platform == "win32":
+        # MSVC ships OpenMP
+        return ["/openmp"], ["-Xcompiler", "/openmp"], []
+    if sys.platform == "darwin":
+        # Apple clang only takes OpenMP through the preprocessor, with libomp installed separately
+        compile_args, link_args = ["-Xpreprocessor", "-fopenmp"], ["-lomp"]
+    else:
+        compile_args, link_args = ["-fopenmp"], ["-fopenmp"]
+    if _supports_openmp(compile_args, link_args):
+        return compile_args, ["-Xcompiler", ",".join(compile_args)], link_args
+    print("OpenMP is not available, the CPU rasterizer is built single-threaded")
+    return [], [], []
+
 
 # build custom rasterizer
 
+openmp_cxx_args, openmp_nvcc_args, openmp_link_args = openmp_args()
+
 custom_rasterizer_module = CUDAExtension(
     "custom_rasterizer_kernel",
     [
@@ -25,6 +72,11 @@ custom_rasterizer_module = CUDAExtension(
         "lib/custom_rasterizer_kernel/grid_neighbor.cpp",
         "lib/custom_rasterizer_kernel/rasterizer_gpu.cu",
     ],
+    extra_compile_args={
+        "cxx": (["/O2"] if sys.platform == "win32" else ["-O3"]) + openmp_cxx_args,
+        "nvcc": ["-O3"] + openmp_nvcc_args,
+    },
+    extra_link_args=openmp_link_args,
 )
 
 setup(
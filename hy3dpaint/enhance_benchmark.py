@@ -0,0 +1,119 @@
+# Hunyuan 3D is licensed under the TENCENT HUNYUAN NON-COMMERCIAL LICENSE AGREEMENT
+# except for the third-party components listed below.
+# Hunyuan 3D does not impose any additional limitations beyond what is outlined
+# in the repsective licenses of these third-party components.
+# Users must comply with all terms and conditions of original licenses of these third-party
+# components and must ensure that the usage of the third party components adheres to
+# all relevant laws and regulations.
+
+# For avoidance of doubts, Hunyuan 3D means the large language models and
+# their software and algorithms, including trained model weights, parameters (including
+# optimizer states), machine-learning model code, inference-enabling code, training-enabling code,
+# fine-tuning enabling code and other elements of the foregoing made publicly available
+# by Tencent in accordance with TENCENT HUNYUAN COMMUNITY LICENSE AGREEMENT.
+
+# CPU benchmark of the view enhancement modes, without the multiview diffusion model.
+# Low resolution "diffusion" views are synthesized from procedural textures on the mesh, enhanced with every
+# mode, baked, and the baked textures are compared (PSNR over the painted texels) against the RealESRGAN bake,
+# and against a reference bake of the same views rendered directly at the bake resolution.
+# RealESRGAN is skipped, and the reference is the only baseline, when its checkpoint is not found.
+
+import argparse
+import os
+import time
+
+import torch
+import trimesh
+
+from DifferentiableRenderer.MeshRender import MeshRender
+from textureGenPipeline import Hunyuan3DPaintConfig
+from utils.image_super_utils import ENHANCE_MODES, ViewEnhancer
+from utils.pipeline_utils import ViewProcessor
+from utils.uvwrap_utils import mesh_uv_wrap
+
+
+def synthetic_views(view_processor, elevs, azims, resolution):
+    """Procedural albedo and mr views: stripes over the position maps, and the normal maps."""
+    positions = view_processor.render_position_multiview(elevs, azims, resolution=resolution)
+    normals = view_processor.render_normal_multiview(elevs, azims, resolution=resolution)
+    albedo = [(0.5 + 0.5 * torch.sin(position * 40.0)).clamp(0, 1) for position in positions]
+    return {"albedo": albedo, "mr": normals}
+
+
+def psnr(texture, reference, mask):
+    mse = ((texture - reference) ** 2)[mask.squeeze(-1)].mean()
+    return (10 * torch.log10(1.0 / mse.clamp(min=1e-12))).item()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mesh", default="./assets/case_1/mesh.glb")
+    parser.add_argument("--realesrgan_ckpt", default="ckpt/RealESRGAN_x4plus.pth")
+    parser.add_argument("--num_view", type=int, default=6)
+    parser.add_argument("--resolution", type=int, default=512)
+    parser.add_argument("--render_size", type=int, default=2048)
+    parser.add_argument("--texture_size", type=int, default=2048)
+    parser.add_argument("--unsharp_amount", type=float, default=0.5)
+    args = parser.parse_args()
+
+    conf = Hunyuan3DPaintConfig(args.num_view, args.resolution)
+    conf.device = "cpu"
+    conf.realesrgan_ckpt_path = args.realesrgan_ckpt
+    conf.enhance_mode = "skip"
+    conf.render_size = args.render_size
+    conf.output_texture_size = args.texture_size
+    conf.texture_supersample = 1
+
+    render = MeshRender(
+        default_resolution=conf.render_size,
+        texture_size=conf.texture_size,
+        bake_mode=conf.bake_mode,
+        raster_mode=conf.raster_mode,
+        device="cpu",
+    )
+    render.load_mesh(mesh=mesh_uv_wrap(trimesh.load(args.mesh, force="mesh")))
+    view_processor = ViewProcessor(conf, render)
+    enhancer = ViewEnhancer(conf)
+
+    elevs = conf.candidate_camera_elevs[: args.num_view]
+    azims = conf.candidate_camera_azims[: args.num_view]
+    weights = conf.candidate_view_weights[: args.num_view]
+    views = synthetic_views(view_processor, elevs, azims, args.resolution)
+    reference_views = synthetic_views(view_processor, elevs, azims, args.render_size)
+
+    def bake(channel_views):
+        start = time.time()
+        baked = view_processor.bake_channels_from_multiview(channel_views, elevs, azims, weights)
+        return baked, time.time() - start
+
+    baselines = {"reference": bake(reference_views)[0]}
+    runs = [(mode, 0.0) for mode in ENHANCE_MODES]
+    runs += [(mode, args.unsharp_amount) for mode in ("bicubic", "lanczos") if args.unsharp_amount > 0]
+    if not os.path.exists(args.realesrgan_ckpt):
+        print(f"RealESRGAN checkpoint {args.realesrgan_ckpt} not found, comparing against the reference only")
+        runs = [run for run in runs if run[0] != "realesrgan"]
+
+    results = []
+    for mode, unsharp_amount in runs:
+        start = time.time()
+        enhanced = enhancer(views, resolution=args.render_size, mode=mode, unsharp_amount=unsharp_amount)
+        enhance_time = time.time() - start
+        baked, bake_time = bake(enhanced)
+        if mode == "realesrgan":
+            baselines["realesrgan"] = baked
+        results.append((mode, unsharp_amount, enhance_time, bake_time, baked))
+
+    print(f"{'mode':<12}{'unsharp':>8}{'enhance s':>11}{'bake s':>9}", end="")
+    for baseline in baselines:
+        print(f"{'psnr ' + baseline + ' albedo/mr':>34}", end="")
+    print()
+    for mode, unsharp_amount, enhance_time, bake_time, baked in results:
+        print(f"{mode:<12}{unsharp_amount:>8.2f}{enhance_time:>11.2f}{bake_time:>9.2f}", end="")
+        for baseline in baselines.values():
+            scores = []
+            for name in ("albedo", "mr"):
+                texture, mask = baked[name]
+                reference, reference_mask = baseline[name]
+                scores.append(psnr(texture, reference, mask & reference_mask))
+            print(f"{scores[0]:>26.2f} / {scores[1]:>5.2f}", end="")
+        print()
@@ -32,7 +32,7 @@ from diffusers.models.attention_processor import Attention, AttnProcessor
 from diffusers.models.transformers.transformer_2d import BasicTransformerBlock
 from .attn_processor import SelfAttnProcessor2_0, RefAttnProcessor2_0, PoseRoPEAttnProcessor2_0
 
-from transformers import AutoImageProcessor, AutoModel
+from transformers import AutoConfig, AutoImageProcessor, AutoModel
 
 
 class Dino_v2(nn.Module):
@@ -46,10 +46,22 @@ class Dino_v2(nn.Module):
     """
 
 
-    def __init__(self, dino_v2_path):
+    def __init__(self, dino_v2_path, shared_weights=None):
         super(Dino_v2, self).__init__()
         self.dino_processor = AutoImageProcessor.from_pretrained(dino_v2_path)
-        self.dino_v2 = AutoModel.from_pretrained(dino_v2_path)
+        if shared_weights is None:
+            self.dino_v2 = AutoModel.from_pretrained(dino_v2_path)
+        else:
+            # weights come from the host-wide store, the checkpoint is only read by the first worker
+            from accelerate import init_empty_weights
+            from transformers.utils import cached_file
+
+            with init_empty_weights():
+                self.dino_v2 = AutoModel.from_config(AutoConfig.from_pretrained(dino_v2_path))
+            # the resolved config lives in the snapshot directory of the checkpoint revision
+            key = shared_weights.key("paint_dino", cached_file(dino_v2_path, "config.json"))
+            state_dict = shared_weights.load(key, lambda: AutoModel.from_pretrained(dino_v2_path).state_dict())
+            self.dino_v2.load_state_dict(state_dict, strict=True, assign=True)
 
         for param in self.parameters():
             param.requires_grad = False
@@ -808,25 +820,46 @@ class UNet2p5DConditionModel(torch.nn.Module):
 
     @staticmethod
     def from_pretrained(pretrained_model_name_or_path, **kwargs):
+        """Build the 2.5D UNet and load its weights.
+
+        With a `shared_weights` store (`hy3dshape.utils.SharedWeightStore`), the model is built with meta
+        parameters that adopt the tensors of the store, and the checkpoint is only read to publish them.
+        """
         torch_dtype = kwargs.pop("torch_dtype", torch.float32)
+        shared_weights = kwargs.pop("shared_weights", None)
         config_path = os.path.join(pretrained_model_name_or_path, "config.json")
         unet_ckpt_path = os.path.join(pretrained_model_name_or_path, "diffusion_pytorch_model.bin")
         with open(config_path, "r", encoding="utf-8") as file:
             config = json.load(file)
-        unet = UNet2DConditionModel(**config)
-        unet_2p5d = UNet2p5DConditionModel(unet)
-        unet_2p5d.unet.conv_in = torch.nn.Conv2d(
-            12,
-            unet.conv_in.out_channels,
-            kernel_size=unet.conv_in.kernel_size,
-            stride=unet.conv_in.stride,
-            padding=unet.conv_in.padding,
-            dilation=unet.conv_in.dilation,
-            groups=unet.conv_in.groups,
-            bias=unet.conv_in.bias is not None,
-        )
-        unet_ckpt = torch.load(unet_ckpt_path, map_location="cpu", weights_only=True)
-        unet_2p5d.load_state_dict(unet_ckpt, strict=True)
+
+        def build():
+            unet = UNet2DConditionModel(**config)
+            unet_2p5d = UNet2p5DConditionModel(unet)
+            unet_2p5d.unet.conv_in = torch.nn.Conv2d(
+                12,
+                unet.conv_in.out_channels,
+                kernel_size=unet.conv_in.kernel_size,
+                stride=unet.conv_in.stride,
+                padding=unet.conv_in.padding,
+                dilation=unet.conv_in.dilation,
+                groups=unet.conv_in.groups,
+                bias=unet.conv_in.bias is not None,
+            )
+            return unet_2p5d
+
+        def load_checkpoint():
+            return torch.load(unet_ckpt_path, map_location="cpu", weights_only=True)
+
+        if shared_weights is None:
+            unet_2p5d = build()
+            unet_2p5d.load_state_dict(load_checkpoint(), strict=True)
+        else:
+            from accelerate import init_empty_weights
+
+            with init_empty_weights():
+                unet_2p5d = build()
+            key = shared_weights.key("paint_unet", unet_ckpt_path, config_path)
+            unet_2p5d.load_state_dict(shared_weights.load(key, load_checkpoint), strict=True, assign=True)
         unet_2p5d = unet_2p5d.to(torch_dtype)
         return unet_2p5d
 
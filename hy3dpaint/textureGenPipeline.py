@@ -14,18 +14,15 @@
 
 import os
 import torch
-import copy
 import trimesh
-import numpy as np
 from PIL import Image
 from typing import List
 from DifferentiableRenderer.MeshRender import MeshRender
 from utils.simplify_mesh_utils import remesh_mesh
 from utils.multiview_utils import multiviewDiffusionNet
 from utils.pipeline_utils import ViewProcessor
-from utils.image_super_utils import imageSuperNet
-from utils.uvwrap_utils import mesh_uv_wrap
-from DifferentiableRenderer.mesh_utils import convert_obj_to_glb
+from utils.image_super_utils import ViewEnhancer
+from utils.uvwrap_utils import mesh_uv_wrap, UVAtlasCache
 import warnings
 
 warnings.filterwarnings("ignore")
@@ -43,17 +40,36 @@ class Hunyuan3DPaintConfig:
         self.multiview_pretrained_path = "tencent/Hunyuan3D-2.1"
         self.dino_ckpt_path = "facebook/dinov2-giant"
         self.realesrgan_ckpt_path = "ckpt/RealESRGAN_x4plus.pth"
+        # view enhancement before baking: "realesrgan", "bicubic", "lanczos" or "skip", see `ViewEnhancer`
+        self.enhance_mode = "realesrgan"
+        # unsharp mask strength applied after the bicubic and lanczos upscales, 0 disables it
+        self.enhance_unsharp_amount = 0.0
+        # activation memory of one super-resolution forward pass, larger batches are chunked and large views tiled
+        self.super_resolution_memory_mb = 4096
 
         self.raster_mode = "cr"
         self.bake_mode = "back_sample"
         self.render_size = 1024 * 2
-        self.texture_size = 1024 * 4
+        # conditioning maps are rendered at the diffusion view size, rasterized at this multiple and area-downsampled
+        self.condition_supersample = 2
+        # textures are delivered at `output_texture_size` and baked and inpainted at `texture_supersample` times it
+        self.output_texture_size = 1024 * 2
+        self.texture_supersample = 1
         self.max_selected_view_num = max_num_view
         self.resolution = resolution
         self.bake_exp = 4
         self.merge_method = "fast"
+        # hole filling of the baked textures: "ns" (OpenCV Navier-Stokes), or "pull_push" on the texture device
+        self.inpaint_method = "ns"
 
-        # view selection
+        # uv unwrapping, set `uv_cache_dir` to reuse atlases of already unwrapped geometry
+        self.uv_unwrap_preset = None
+        self.uv_unwrap_workers = 1
+        self.uv_cache_dir = None
+        self.uv_cache_size = 64
+
+        # view selection, visibility of the candidates is rendered at `view_selection_resolution`
+        self.view_selection_resolution = 1024
         self.candidate_camera_azims = [0, 90, 180, 270, 0, 180]
         self.candidate_camera_elevs = [0, 0, 0, 0, 90, -90]
         self.candidate_view_weights = [1, 0.1, 0.5, 0.1, 0.05, 0.05]
@@ -67,11 +83,18 @@ class Hunyuan3DPaintConfig:
             self.candidate_camera_elevs.append(-20)
             self.candidate_view_weights.append(0.01)
 
+    @property
+    def texture_size(self):
+        """Working UV resolution of baking and inpainting."""
+        return self.output_texture_size * self.texture_supersample
+
 
 class Hunyuan3DPaintPipeline:
 
-    def __init__(self, config=None) -> None:
+    def __init__(self, config=None, shared_weights=None) -> None:
+        """`shared_weights` is an optional `hy3dshape.utils.SharedWeightStore` the diffusion UNet and DINO load from."""
         self.config = config if config is not None else Hunyuan3DPaintConfig()
+        self.shared_weights = shared_weights
         self.models = {}
         self.stats_logs = {}
         self.render = MeshRender(
@@ -81,42 +104,71 @@ class Hunyuan3DPaintPipeline:
             raster_mode=self.config.raster_mode,
         )
         self.view_processor = ViewProcessor(self.config, self.render)
+        self.uv_cache = None
+        if getattr(self.config, "uv_cache_dir", None) is not None:
+            self.uv_cache = UVAtlasCache(self.config.uv_cache_dir, max_entries=self.config.uv_cache_size)
         self.load_models()
 
     def load_models(self):
         torch.cuda.empty_cache()
-        self.models["super_model"] = imageSuperNet(self.config)
-        self.models["multiview_model"] = multiviewDiffusionNet(self.config)
+        self.enhancer = ViewEnhancer(self.config)
+        self.models["multiview_model"] = multiviewDiffusionNet(self.config, shared_weights=self.shared_weights)
         print("Models Loaded.")
 
     @torch.no_grad()
-    def __call__(self, mesh_path=None, image_path=None, output_mesh_path=None, use_remesh=True, save_glb=True):
-        """Generate texture for 3D mesh using multiview diffusion"""
+    def __call__(
+        self,
+        mesh_path=None,
+        image_path=None,
+        output_mesh_path=None,
+        use_remesh=True,
+        save_glb=True,
+        mesh=None,
+        enhance_mode=None,
+        unsharp_amount=None,
+    ):
+        """Generate texture for 3D mesh using multiview diffusion
+
+        The mesh is given either as `mesh_path` or in memory as `mesh` (a `trimesh.Trimesh` or `trimesh.Scene`),
+        and `image_path` may be a path, a PIL image or a list of them. When an output path is given or can be
+        derived from `mesh_path`, the textured mesh is saved there and its path is returned. Otherwise the
+        textured `trimesh.Trimesh` is returned and nothing is written to disk.
+
+        `enhance_mode` and `unsharp_amount` override the configured view enhancement for this request.
+        """
+        try:
+            return self._paint(
+                mesh_path, image_path, output_mesh_path, use_remesh, save_glb, mesh, enhance_mode, unsharp_amount
+            )
+        finally:
+            # the view rasterizations only serve this request, release them with it
+            self.render.clear_raster_cache()
+
+    def _paint(
+        self, mesh_path, image_path, output_mesh_path, use_remesh, save_glb, mesh, enhance_mode, unsharp_amount
+    ):
         # Ensure image_prompt is a list
-        if isinstance(image_path, str):
-            image_prompt = Image.open(image_path)
-        elif isinstance(image_path, Image.Image):
-            image_prompt = image_path
-        if not isinstance(image_prompt, List):
-            image_prompt = [image_prompt]
-        else:
-            image_prompt = image_path
-
-        # Process mesh
-        path = os.path.dirname(mesh_path)
-        if use_remesh:
-            processed_mesh_path = os.path.join(path, "white_mesh_remesh.obj")
-            remesh_mesh(mesh_path, processed_mesh_path)
-        else:
-            processed_mesh_path = mesh_path
+        image_prompt = image_path if isinstance(image_path, List) else [image_path]
+        image_prompt = [Image.open(image) if isinstance(image, str) else image for image in image_prompt]
 
         # Output path
-        if output_mesh_path is None:
-            output_mesh_path = os.path.join(path, f"textured_mesh.obj")
+        if output_mesh_path is None and mesh_path is not None:
+            output_mesh_path = os.path.join(os.path.dirname(mesh_path), f"textured_mesh.obj")
 
-        # Load mesh
-        mesh = trimesh.load(processed_mesh_path)
-        mesh = mesh_uv_wrap(mesh)
+        # Load and process mesh in memory, so concurrent jobs never share intermediate files
+        if mesh is None:
+            mesh = trimesh.load(mesh_path)
+        if use_remesh:
+            mesh = remesh_mesh(mesh)
+        elif isinstance(mesh, trimesh.Trimesh):
+            # UV unwrapping replaces the geometry in place, leave the caller's mesh untouched
+            mesh = mesh.copy()
+        mesh = mesh_uv_wrap(
+            mesh,
+            cache=self.uv_cache,
+            preset=self.config.uv_unwrap_preset,
+            num_workers=self.config.uv_unwrap_workers,
+        )
         self.render.load_mesh(mesh=mesh)
 
         ########### View Selection #########
@@ -128,9 +180,11 @@ class Hunyuan3DPaintPipeline:
         )
 
         normal_maps = self.view_processor.render_normal_multiview(
-            selected_camera_elevs, selected_camera_azims, use_abs_coor=True
+            selected_camera_elevs, selected_camera_azims, use_abs_coor=True, resolution=self.config.resolution
+        )
+        position_maps = self.view_processor.render_position_multiview(
+            selected_camera_elevs, selected_camera_azims, resolution=self.config.resolution
         )
-        position_maps = self.view_processor.render_position_multiview(selected_camera_elevs, selected_camera_azims)
 
         ##########  Style  ###########
         image_caption = "high quality"
@@ -153,39 +207,37 @@ class Hunyuan3DPaintPipeline:
             resize_input=True,
         )
         ###########  Enhance  ##########
-        enhance_images = {}
-        enhance_images["albedo"] = copy.deepcopy(multiviews_pbr["albedo"])
-        enhance_images["mr"] = copy.deepcopy(multiviews_pbr["mr"])
-
-        for i in range(len(enhance_images["albedo"])):
-            enhance_images["albedo"][i] = self.models["super_model"](enhance_images["albedo"][i])
-            enhance_images["mr"][i] = self.models["super_model"](enhance_images["mr"][i])
+        # views stay float tensors on device from the renders through diffusion and enhancement to baking
+        enhance_images = self.enhancer(
+            {name: multiviews_pbr[name] for name in ("albedo", "mr")},
+            resolution=self.config.render_size,
+            mode=enhance_mode,
+            unsharp_amount=unsharp_amount,
+        )
 
         ###########  Bake  ##########
-        for i in range(len(enhance_images)):
-            enhance_images["albedo"][i] = enhance_images["albedo"][i].resize(
-                (self.config.render_size, self.config.render_size)
-            )
-            enhance_images["mr"][i] = enhance_images["mr"][i].resize((self.config.render_size, self.config.render_size))
-        texture, mask = self.view_processor.bake_from_multiview(
-            enhance_images["albedo"], selected_camera_elevs, selected_camera_azims, selected_view_weights
+        baked = self.view_processor.bake_channels_from_multiview(
+            enhance_images, selected_camera_elevs, selected_camera_azims, selected_view_weights
         )
-        mask_np = (mask.squeeze(-1).cpu().numpy() * 255).astype(np.uint8)
-        texture_mr, mask_mr = self.view_processor.bake_from_multiview(
-            enhance_images["mr"], selected_camera_elevs, selected_camera_azims, selected_view_weights
-        )
-        mask_mr_np = (mask_mr.squeeze(-1).cpu().numpy() * 255).astype(np.uint8)
+        texture, mask = baked["albedo"]
+        texture_mr, mask_mr = baked["mr"]
 
         ##########  inpaint  ###########
-        texture = self.view_processor.texture_inpaint(texture, mask_np)
+        texture = self.view_processor.texture_inpaint(texture, mask)
         self.render.set_texture(texture, force_set=True)
         if "mr" in enhance_images:
-            texture_mr = self.view_processor.texture_inpaint(texture_mr, mask_mr_np)
+            texture_mr = self.view_processor.texture_inpaint(texture_mr, mask_mr)
             self.render.set_texture_mr(texture_mr)
 
-        self.render.save_mesh(output_mesh_path, downsample=True)
+        if output_mesh_path is None:
+            return self.render.get_textured_mesh(texture_size=self.config.output_texture_size)
+
+        self.render.save_mesh(output_mesh_path, texture_size=self.config.output_texture_size)
 
         if save_glb:
+            # bpy is only needed on this path, in-memory results never import it
+            from DifferentiableRenderer.mesh_utils import convert_obj_to_glb
+
             convert_obj_to_glb(output_mesh_path, output_mesh_path.replace(".obj", ".glb"))
             output_glb_path = output_mesh_path.replace(".obj", ".glb")
 
@@ -16,6 +16,7 @@ import os
 import torch
 import random
 import numpy as np
+import torch.nn.functional as F
 from PIL import Image
 from typing import List
 import huggingface_hub
@@ -25,7 +26,7 @@ from diffusers import EulerAncestralDiscreteScheduler, DDIMScheduler, UniPCMulti
 
 
 class multiviewDiffusionNet:
-    def __init__(self, config) -> None:
+    def __init__(self, config, shared_weights=None) -> None:
         self.device = config.device
 
         cfg_path = config.multiview_cfg_path
@@ -40,10 +41,19 @@ class multiviewDiffusionNet:
         )
 
         model_path = os.path.join(model_path, "hunyuan3d-paintpbr-v2-1")
+        components = {}
+        if shared_weights is not None:
+            # build the UNet from the host-wide weight store, diffusers then skips loading it
+            from hunyuanpaintpbr.unet.modules import UNet2p5DConditionModel
+
+            components["unet"] = UNet2p5DConditionModel.from_pretrained(
+                os.path.join(model_path, "unet"), torch_dtype=torch.float16, shared_weights=shared_weights
+            )
         pipeline = DiffusionPipeline.from_pretrained(
             model_path,
             custom_pipeline=custom_pipeline, 
-            torch_dtype=torch.float16
+            torch_dtype=torch.float16,
+            **components,
         )
 
         pipeline.scheduler = UniPCMultistepScheduler.from_config(pipeline.scheduler.config, timestep_spacing="trailing")
@@ -54,7 +64,7 @@ class multiviewDiffusionNet:
 
         if hasattr(self.pipeline.unet, "use_dino") and self.pipeline.unet.use_dino:
             from hunyuanpaintpbr.unet.modules import Dino_v2
-            self.dino_v2 = Dino_v2(config.dino_ckpt_path).to(torch.float16)
+            self.dino_v2 = Dino_v2(config.dino_ckpt_path, shared_weights=shared_weights).to(torch.float16)
             self.dino_v2 = self.dino_v2.to(self.device)
 
     def seed_everything(self, seed):
@@ -64,11 +74,38 @@ class multiviewDiffusionNet:
         os.environ["PL_GLOBAL_SEED"] = str(seed)
 
     @torch.no_grad()
-    def __call__(self, images, conditions, prompt=None, custom_view_size=None, resize_input=False):
-        pils = self.forward_one(
+    def __call__(self, images, conditions, prompt=None, custom_view_size=None, resize_input=False, return_type="th"):
+        """Generate multiview PBR images.
+
+        `conditions` are the normal maps followed by the position maps, as PIL images or float [H, W, C] tensors.
+        Views are returned as float [H, W, 3] tensors on the pipeline device for `return_type="th"`, or as PIL
+        images for `return_type="pl"`.
+        """
+        views = self.forward_one(
             images, conditions, prompt=prompt, custom_view_size=custom_view_size, resize_input=resize_input
         )
-        return pils
+        if return_type == "pl":
+            views = {name: [view_to_pil(view) for view in channel] for name, channel in views.items()}
+        return views
+
+    def _condition_tensor(self, control_images, size):
+        """Stack condition maps into the [1, N, 3, H, W] tensor the pipeline encodes, on the pipeline device."""
+        views = []
+        for image in control_images:
+            if isinstance(image, Image.Image):
+                if image.mode == "L":
+                    image = image.point(lambda x: 255 if x > 1 else 0, mode="1")
+                image = torch.from_numpy(np.asarray(image.convert("RGBA"), dtype=np.float32) / 255.0)
+            image = image.to(self.pipeline.device, dtype=torch.float32)
+            if image.shape[-1] > 3:
+                # composite on the white background the conditions were rendered with
+                alpha = image[..., 3:]
+                image = image[..., :3] * alpha + (1 - alpha)
+            views.append(image.permute(2, 0, 1))
+        views = torch.stack(views)
+        if views.shape[-2:] != (size, size):
+            views = F.interpolate(views, size=(size, size), mode="bilinear", align_corners=False, antialias=True)
+        return views.unsqueeze(0).to(self.pipeline.vae.dtype).contiguous()
 
     def forward_one(self, input_images, control_images, prompt=None, custom_view_size=None, resize_input=False):
         self.seed_everything(0)
@@ -81,15 +118,11 @@ class multiviewDiffusionNet:
             ]
         else:
             input_images = [input_image.resize((custom_view_size, custom_view_size)) for input_image in input_images]
-        for i in range(len(control_images)):
-            control_images[i] = control_images[i].resize((custom_view_size, custom_view_size))
-            if control_images[i].mode == "L":
-                control_images[i] = control_images[i].point(lambda x: 255 if x > 1 else 0, mode="1")
         kwargs = dict(generator=torch.Generator(device=self.pipeline.device).manual_seed(0))
 
         num_view = len(control_images) // 2
-        normal_image = [[control_images[i] for i in range(num_view)]]
-        position_image = [[control_images[i + num_view] for i in range(num_view)]]
+        normal_image = self._condition_tensor(control_images[:num_view], custom_view_size)
+        position_image = self._condition_tensor(control_images[num_view:], custom_view_size)
 
         kwargs["width"] = custom_view_size
         kwargs["height"] = custom_view_size
@@ -116,8 +149,10 @@ class multiviewDiffusionNet:
             prompt=prompt,
             sync_condition=sync_condition,
             guidance_scale=3.0,
+            output_type="pt",
             **kwargs,
         ).images
+        mvd_image = list(mvd_image.float().permute(0, 2, 3, 1))
 
         if "pbr" in self.mode:
             mvd_image = {"albedo": mvd_image[:num_view], "mr": mvd_image[num_view:]}
@@ -126,3 +161,9 @@ class multiviewDiffusionNet:
             mvd_image = {"hdr": mvd_image}
 
         return mvd_image
+
+
+def view_to_pil(image):
+    """Convert a float [H, W, C] view tensor in [0, 1] to a PIL image, for debugging and export only."""
+    image = (image.detach().clamp(0, 1) * 255).round().to(torch.uint8).cpu().numpy()
+    return Image.fromarray(image.squeeze(-1) if image.shape[-1] == 1 else image)
@@ -13,7 +13,6 @@
 # by Tencent in accordance with TENCENT HUNYUAN COMMUNITY LICENSE AGREEMENT.
 
 import torch
-import numpy as np
 
 
 class ViewProcessor:
@@ -21,115 +20,124 @@ class ViewProcessor:
         self.config = config
         self.render = render
 
-    def render_normal_multiview(self, camera_elevs, camera_azims, use_abs_coor=True):
-        normal_maps = []
-        for elev, azim in zip(camera_elevs, camera_azims):
-            normal_map = self.render.render_normal(elev, azim, use_abs_coor=use_abs_coor, return_type="pl")
-            normal_maps.append(normal_map)
-
-        return normal_maps
-
-    def render_position_multiview(self, camera_elevs, camera_azims):
-        position_maps = []
-        for elev, azim in zip(camera_elevs, camera_azims):
-            position_map = self.render.render_position(elev, azim, return_type="pl")
-            position_maps.append(position_map)
-
-        return position_maps
+    def render_normal_multiview(self, camera_elevs, camera_azims, use_abs_coor=True, resolution=None, return_type="th"):
+        """Render normal maps, at `resolution` (e.g. the diffusion view size) instead of the render size if given."""
+        return self.render.render_normal_multiview(
+            camera_elevs,
+            camera_azims,
+            use_abs_coor=use_abs_coor,
+            resolution=resolution,
+            supersample=self._condition_supersample(resolution),
+            return_type=return_type,
+        )
+
+    def render_position_multiview(self, camera_elevs, camera_azims, resolution=None, return_type="th"):
+        """Render position maps, at `resolution` (e.g. the diffusion view size) instead of the render size if given."""
+        return self.render.render_position_multiview(
+            camera_elevs,
+            camera_azims,
+            resolution=resolution,
+            supersample=self._condition_supersample(resolution),
+            return_type=return_type,
+        )
+
+    def _condition_supersample(self, resolution):
+        return 1 if resolution is None else getattr(self.config, "condition_supersample", 1)
 
     def bake_view_selection(
         self, candidate_camera_elevs, candidate_camera_azims, candidate_view_weights, max_selected_view_num
     ):
+        """Greedy area-weighted max coverage over the candidate views.
+
+        Visibility is a boolean view x face coverage matrix built from one batched render of all candidates,
+        so each greedy step is a single masked matrix-vector product instead of Python set operations.
+        """
 
         original_resolution = self.render.default_resolution
         self.render.set_default_render_resolution(1024)
-
-        selected_camera_elevs = []
-        selected_camera_azims = []
-        selected_view_weights = []
-        selected_alpha_maps = []
-        viewed_tri_idxs = []
-        viewed_masks = []
+        self.render.set_boundary_unreliable_scale(2)
+        visibility_resolution = getattr(self.config, "view_selection_resolution", 1024)
 
         # 计算每个三角片的面积
-        face_areas = self.render.get_face_areas(from_one_index=True)
-        total_area = face_areas.sum()
-        face_area_ratios = face_areas / total_area
+        face_areas = torch.from_numpy(self.render.get_face_areas(from_one_index=True)).double()
+        face_area_ratios = (face_areas / face_areas.sum()).to(self.render.device)
 
         candidate_view_num = len(candidate_camera_elevs)
-        self.render.set_boundary_unreliable_scale(2)
-
-        for elev, azim in zip(candidate_camera_elevs, candidate_camera_azims):
-            viewed_tri_idx = self.render.render_alpha(elev, azim, return_type="np")
-            viewed_tri_idxs.append(set(np.unique(viewed_tri_idx.flatten())))
-            viewed_masks.append(viewed_tri_idx[0, :, :, 0] > 0)
-
-        is_selected = [False for _ in range(candidate_view_num)]
-        total_viewed_tri_idxs = set()
-        total_viewed_area = 0.0
-
-        for idx in range(6):
-            selected_camera_elevs.append(candidate_camera_elevs[idx])
-            selected_camera_azims.append(candidate_camera_azims[idx])
-            selected_view_weights.append(candidate_view_weights[idx])
-            selected_alpha_maps.append(viewed_masks[idx])
-            is_selected[idx] = True
-            total_viewed_tri_idxs.update(viewed_tri_idxs[idx])
-
-        total_viewed_area = face_area_ratios[list(total_viewed_tri_idxs)].sum()
-        for iter in range(max_selected_view_num - len(selected_view_weights)):
-            max_inc = 0
-            max_idx = -1
-
-            for idx, (elev, azim, weight) in enumerate(
-                zip(candidate_camera_elevs, candidate_camera_azims, candidate_view_weights)
-            ):
-                if is_selected[idx]:
-                    continue
-                new_tri_idxs = viewed_tri_idxs[idx] - total_viewed_tri_idxs
-                new_inc_area = face_area_ratios[list(new_tri_idxs)].sum()
-
-                if new_inc_area > max_inc:
-                    max_inc = new_inc_area
-                    max_idx = idx
+        viewed_tri_idxs = self.render.render_alpha_multiview(
+            candidate_camera_elevs, candidate_camera_azims, resolution=visibility_resolution
+        )
+        viewed_tri_idxs = viewed_tri_idxs.view(candidate_view_num, -1)
+        coverage = torch.zeros(candidate_view_num, face_areas.shape[0], dtype=torch.bool, device=viewed_tri_idxs.device)
+        coverage.scatter_(1, viewed_tri_idxs, True)
+        coverage[:, 0] = False  # background
+
+        is_selected = torch.zeros(candidate_view_num, dtype=torch.bool, device=coverage.device)
+        is_selected[:6] = True
+        selected_idxs = list(range(6))
+        total_viewed = coverage[:6].any(dim=0)
+
+        for iter in range(max_selected_view_num - len(selected_idxs)):
+            new_inc_areas = (coverage & ~total_viewed).double() @ face_area_ratios
+            new_inc_areas[is_selected] = 0
+            max_idx = int(torch.argmax(new_inc_areas))
+            max_inc = float(new_inc_areas[max_idx])
 
             if max_inc > 0.01:
                 is_selected[max_idx] = True
-                selected_camera_elevs.append(candidate_camera_elevs[max_idx])
-                selected_camera_azims.append(candidate_camera_azims[max_idx])
-                selected_view_weights.append(candidate_view_weights[max_idx])
-                selected_alpha_maps.append(viewed_masks[max_idx])
-                total_viewed_tri_idxs = total_viewed_tri_idxs.union(viewed_tri_idxs[max_idx])
-                total_viewed_area += max_inc
+                selected_idxs.append(max_idx)
+                total_viewed |= coverage[max_idx]
             else:
                 break
 
         self.render.set_default_render_resolution(original_resolution)
 
+        selected_camera_elevs = [candidate_camera_elevs[idx] for idx in selected_idxs]
+        selected_camera_azims = [candidate_camera_azims[idx] for idx in selected_idxs]
+        selected_view_weights = [candidate_view_weights[idx] for idx in selected_idxs]
         return selected_camera_elevs, selected_camera_azims, selected_view_weights
 
     def bake_from_multiview(self, views, camera_elevs, camera_azims, view_weights):
-        project_textures, project_weighted_cos_maps = [], []
-        project_boundary_maps = []
-
-        for view, camera_elev, camera_azim, weight in zip(views, camera_elevs, camera_azims, view_weights):
-            project_texture, project_cos_map, project_boundary_map = self.render.back_project(
-                view, camera_elev, camera_azim
-            )
-            project_cos_map = weight * (project_cos_map**self.config.bake_exp)
-            project_textures.append(project_texture)
-            project_weighted_cos_maps.append(project_cos_map)
-            project_boundary_maps.append(project_boundary_map)
-            texture, ori_trust_map = self.render.fast_bake_texture(project_textures, project_weighted_cos_maps)
-        return texture, ori_trust_map > 1e-8
-
-    def texture_inpaint(self, texture, mask, defualt=None):
+        baked = self.bake_channels_from_multiview({"texture": views}, camera_elevs, camera_azims, view_weights)
+        return baked["texture"]
+
+    def bake_channels_from_multiview(self, channel_views, camera_elevs, camera_azims, view_weights):
+        """Bake several channels (e.g. albedo and mr) rendered from the same views in a single pass.
+
+        The back-projection geometry of each view is computed once and shared by all channels.
+        Returns a dict mapping each channel name to its (texture, mask).
+        """
+        names = list(channel_views)
+        accumulators = {}
+        for view_idx, (camera_elev, camera_azim, weight) in enumerate(zip(camera_elevs, camera_azims, view_weights)):
+            views = {name: self.render.prepare_bake_image(channel_views[name][view_idx]) for name in names}
+            geometry = self.render.back_project_geometry(camera_elev, camera_azim, views[names[0]].shape[:2])
+            project_cos_map = weight * (geometry["cos_map"] ** self.config.bake_exp)
+            for name in names:
+                project_texture = self.render.back_project_image(views[name], geometry)
+                if name not in accumulators:
+                    accumulators[name] = self.render.bake_accumulator(project_texture.shape[-1])
+                accumulators[name].add(project_texture, project_cos_map)
+        return {name: accumulators[name].result() for name in names}
+
+    def texture_inpaint(self, texture, mask, defualt=None, method=None):
+        """Fill the texels of `texture` outside `mask` ([H, W] or [H, W, 1], numpy or tensor).
+
+        `method` is "pull_push" (vertex color seeding and pull-push on the texture device) or "ns" (C++ vertex
+        inpainting and OpenCV Navier-Stokes on CPU), `config.inpaint_method` if None.
+        """
+        mask = torch.as_tensor(mask, device=texture.device)
+        if mask.dim() == 3:
+            mask = mask.squeeze(-1)
+        mask = mask > 0
         if defualt is not None:
-            mask = mask.astype(bool)
             inpaint_value = torch.tensor(defualt, dtype=texture.dtype, device=texture.device)
             texture[~mask] = inpaint_value
-        else:
-            texture_np = self.render.uv_inpaint(texture, mask)
-            texture = torch.tensor(texture_np / 255).float().to(texture.device)
-
-        return texture
+            return texture
+
+        method = method or getattr(self.config, "inpaint_method", "ns")
+        if method == "pull_push":
+            return self.render.uv_inpaint_pull_push(texture, mask).to(texture.device)
+        if method != "ns":
+            raise ValueError(f"Unknown inpaint method {method}, available: ('pull_push', 'ns')")
+        texture_np = self.render.uv_inpaint(texture, mask)
+        return torch.tensor(texture_np / 255).float().to(texture.device)
@@ -13,25 +13,36 @@
 # by Tencent in accordance with TENCENT HUNYUAN COMMUNITY LICENSE AGREEMENT.
 
 import trimesh
-import pymeshlab
 
 
-def remesh_mesh(mesh_path, remesh_path):
-    mesh = mesh_simplify_trimesh(mesh_path, remesh_path)
+def remesh_mesh(mesh, remesh_path=None, target_count=40000):
+    """
+    Simplify the mesh to be painted, in memory.
 
+    Args:
+        mesh: `trimesh.Trimesh`, `trimesh.Scene` or path of a mesh file.
+        remesh_path: optionally also write the result there, for debugging.
+        target_count: maximum number of faces of the result.
+
+    Returns:
+        trimesh.Trimesh: the simplified mesh.
+    """
+    mesh = mesh_simplify_trimesh(mesh, target_count=target_count)
+    if remesh_path is not None:
+        mesh.export(remesh_path)
+    return mesh
 
-def mesh_simplify_trimesh(inputpath, outputpath, target_count=40000):
-    # 先去除离散面
-    ms = pymeshlab.MeshSet()
-    if inputpath.endswith(".glb"):
-        ms.load_new_mesh(inputpath, load_in_a_single_layer=True)
-    else:
-        ms.load_new_mesh(inputpath)
-    ms.save_current_mesh(outputpath.replace(".glb", ".obj"), save_textures=False)
-    # 调用减面函数
-    courent = trimesh.load(outputpath.replace(".glb", ".obj"), force="mesh")
-    face_num = courent.faces.shape[0]
 
-    if face_num > target_count:
-        courent = courent.simplify_quadric_decimation(target_count)
-    courent.export(outputpath)
+def mesh_simplify_trimesh(mesh, target_count=40000):
+    if isinstance(mesh, str):
+        # 合并 GLB 场景中的所有节点为单个网格
+        mesh = trimesh.load(mesh, force="mesh")
+    elif isinstance(mesh, trimesh.Scene):
+        mesh = mesh.dump(concatenate=True)
+    # 只保留几何, 与原先经 OBJ 中转的结果一致 (合并重复顶点, 丢弃纹理)
+    mesh = trimesh.Trimesh(vertices=mesh.vertices, faces=mesh.faces, process=True)
+
+    # 调用减面函数
+    if mesh.faces.shape[0] > target_count:
+        mesh = mesh.simplify_quadric_decimation(target_count)
+    return mesh
@@ -12,18 +12,223 @@
 # fine-tuning enabling code and other elements of the foregoing made publicly available
 # by Tencent in accordance with TENCENT HUNYUAN COMMUNITY LICENSE AGREEMENT.
 
+import os
+import json
+import uuid
+import hashlib
+import numpy as np
 import trimesh
 import xatlas
+from concurrent.futures import ProcessPoolExecutor
 
+# Speed/quality presets of the xatlas chart and pack options, None keeps the xatlas defaults.
+# Brute-force packing tries every placement and dominates the unwrap time of large meshes.
+UV_UNWRAP_PRESETS = {
+    "fast": {
+        "chart": {"max_iterations": 1},
+        "pack": {"bruteForce": False, "padding": 1, "resolution": 2048},
+    },
+    "balanced": {
+        "chart": {"max_iterations": 2},
+        "pack": {"bruteForce": False, "padding": 2, "resolution": 4096},
+    },
+    "quality": {
+        "chart": {"max_iterations": 4},
+        "pack": {"bruteForce": True, "padding": 4, "resolution": 4096},
+    },
+}
 
-def mesh_uv_wrap(mesh):
+
+class UVAtlasCache:
+    """
+    On-disk LRU cache of xatlas results, keyed by a content hash of the mesh and the unwrap options.
+
+    Re-texturing the same geometry (e.g. with another reference image or seed) then skips `xatlas.parametrize`.
+    Entries are `.npz` files holding vmapping/indices/uvs; the least recently used ones are evicted
+    beyond `max_entries`.
+    """
+
+    def __init__(self, root=None, max_entries=64):
+        root = root or os.environ.get("HY3DPAINT_UV_CACHE", "~/.cache/hy3dpaint/uv_atlas")
+        self.root = os.path.expanduser(root)
+        self.max_entries = max_entries
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def key(vertices, faces, options=None):
+        digest = hashlib.sha256()
+        digest.update(np.ascontiguousarray(vertices, dtype=np.float32).tobytes())
+        digest.update(np.ascontiguousarray(faces, dtype=np.int64).tobytes())
+        digest.update(json.dumps(options or {}, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.root, f"{key}.npz")
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with np.load(path) as data:
+                result = data["vmapping"], data["indices"], data["uvs"]
+        except (OSError, KeyError, ValueError):
+            return None
+        # refresh the access time used for LRU eviction
+        os.utime(path)
+        return result
+
+    def put(self, key, vmapping, indices, uvs):
+        # write to a private file then rename, so concurrent workers never read a partial entry
+        tmp_path = os.path.join(self.root, f"{key}.{uuid.uuid4().hex}.tmp.npz")
+        np.savez(tmp_path, vmapping=vmapping, indices=indices, uvs=uvs)
+        os.replace(tmp_path, self.path(key))
+        self.evict()
+
+    def evict(self):
+        entries = [os.path.join(self.root, name) for name in os.listdir(self.root) if name.endswith(".npz")]
+        entries = [entry for entry in entries if ".tmp." not in entry]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda entry: os.path.getmtime(entry))
+        for entry in entries[: len(entries) - self.max_entries]:
+            try:
+                os.remove(entry)
+            except FileNotFoundError:
+                pass
+
+
+def _make_options(options_cls, values):
+    options = options_cls()
+    for name, value in values.items():
+        setattr(options, name, value)
+    return options
+
+
+def _parametrize(vertices, faces, options, uvs=None):
+    """Run xatlas on one mesh, optionally packing precomputed `uvs` charts instead of charting."""
+    chart_options = _make_options(xatlas.ChartOptions, options.get("chart", {}))
+    pack_options = _make_options(xatlas.PackOptions, options.get("pack", {}))
+    atlas = xatlas.Atlas()
+    if uvs is None:
+        atlas.add_mesh(vertices, faces)
+    else:
+        atlas.add_mesh(vertices, faces, uvs=uvs)
+        chart_options.use_input_mesh_uvs = True
+    atlas.generate(chart_options=chart_options, pack_options=pack_options)
+    return atlas[0]
+
+
+def _partition_faces(mesh, num_parts, min_faces=2000):
+    """
+    Split the faces into about `num_parts` groups of similar size for parallel charting.
+
+    Connected components are kept whole and balanced greedily. When there are fewer components than
+    parts, the largest group is bisected at the median face centroid along its longest axis, which
+    only adds a chart seam along the cut.
+    """
+    labels = trimesh.graph.connected_component_labels(mesh.face_adjacency, node_count=len(mesh.faces))
+    components = sorted(
+        [np.flatnonzero(labels == label) for label in np.unique(labels)], key=len, reverse=True
+    )
+    groups = [[] for _ in range(min(num_parts, len(components)))]
+    sizes = [0] * len(groups)
+    for component in components:
+        i = int(np.argmin(sizes))
+        groups[i].append(component)
+        sizes[i] += len(component)
+    groups = [np.concatenate(group) for group in groups]
+
+    centroids = mesh.triangles_center
+    while len(groups) < num_parts:
+        groups.sort(key=len)
+        largest = groups[-1]
+        if len(largest) < 2 * min_faces:
+            break
+        points = centroids[largest]
+        axis = int(np.argmax(points.max(0) - points.min(0)))
+        order = np.argsort(points[:, axis], kind="stable")
+        half = len(order) // 2
+        groups = groups[:-1] + [largest[order[:half]], largest[order[half:]]]
+    return groups
+
+
+def _uv_to_surface_scale(positions, indices, uvs):
+    """Scale that makes the uv area of a set of charts equal to their surface area."""
+    surface_area = trimesh.triangles.area(positions[indices]).sum()
+    edges = uvs[indices[:, 1:]] - uvs[indices[:, :1]]
+    uv_area = 0.5 * np.abs(edges[:, 0, 0] * edges[:, 1, 1] - edges[:, 0, 1] * edges[:, 1, 0]).sum()
+    return float(np.sqrt(surface_area / max(uv_area, 1e-12)))
+
+
+def _parametrize_parallel(mesh, options, num_workers):
+    """Chart face groups in a process pool, then pack all charts into one atlas."""
+    parts = []
+    for face_ids in _partition_faces(mesh, num_workers):
+        faces = mesh.faces[face_ids]
+        vertex_ids, local_faces = np.unique(faces, return_inverse=True)
+        parts.append((vertex_ids, local_faces.reshape(-1, 3).astype(np.uint32)))
+    if len(parts) == 1:
+        return _parametrize(mesh.vertices, mesh.faces, options)
+
+    # charting only: packing each part is wasted work, it is redone jointly below
+    chart_only = {"chart": options.get("chart", {}), "pack": {"bruteForce": False}}
+    with ProcessPoolExecutor(max_workers=min(num_workers, len(parts))) as executor:
+        futures = [
+            executor.submit(_parametrize, mesh.vertices[vertex_ids], faces, chart_only)
+            for vertex_ids, faces in parts
+        ]
+        charts = [future.result() for future in futures]
+
+    # pack the charts of all parts together, reusing their uvs as input charts
+    vertex_ids = np.concatenate([part[0][vmapping] for part, (vmapping, _, _) in zip(parts, charts)])
+    offsets = np.cumsum([0] + [len(vmapping) for vmapping, _, _ in charts[:-1]])
+    faces = np.concatenate([indices + offset for (_, indices, _), offset in zip(charts, offsets)])
+    # every part was packed into its own unit square, rescale the uvs to a common texel density
+    uvs = np.concatenate([
+        _uv_to_surface_scale(mesh.vertices[part[0][vmapping]], indices, chart_uvs) * chart_uvs
+        for part, (vmapping, indices, chart_uvs) in zip(parts, charts)
+    ])
+    vmapping, indices, uvs = _parametrize(mesh.vertices[vertex_ids], faces.astype(np.uint32), options, uvs=uvs)
+    return vertex_ids[vmapping], indices, uvs
+
+
+def mesh_uv_wrap(mesh, cache=None, preset=None, num_workers=1):
+    """
+    UV unwrap a mesh with xatlas.
+
+    Args:
+        mesh: `trimesh.Trimesh` or `trimesh.Scene`, updated with the unwrapped vertices, faces and uvs.
+        cache: optional `UVAtlasCache` reused across calls with the same geometry and options.
+        preset: name in `UV_UNWRAP_PRESETS` or a dict with `chart`/`pack` option overrides,
+            None keeps the xatlas defaults.
+        num_workers: with more than one worker, face groups are charted in a process pool and packed
+            into one atlas, so the unwrap time scales with cores.
+    """
     if isinstance(mesh, trimesh.Scene):
         mesh = mesh.dump(concatenate=True)
 
     if len(mesh.faces) > 500000000:
         raise ValueError("The mesh has more than 500,000,000 faces, which is not supported.")
 
-    vmapping, indices, uvs = xatlas.parametrize(mesh.vertices, mesh.faces)
+    if isinstance(preset, str):
+        if preset not in UV_UNWRAP_PRESETS:
+            raise ValueError(f"Unknown uv unwrap preset {preset}, available: {list(UV_UNWRAP_PRESETS)}")
+        preset = UV_UNWRAP_PRESETS[preset]
+    options = preset or {}
+
+    result = None
+    if cache is not None:
+        key = cache.key(mesh.vertices, mesh.faces, dict(options, num_workers=num_workers))
+        result = cache.get(key)
+    if result is None:
+        if num_workers > 1:
+            result = _parametrize_parallel(mesh, options, num_workers)
+        elif options:
+            result = _parametrize(mesh.vertices, mesh.faces, options)
+        else:
+            result = xatlas.parametrize(mesh.vertices, mesh.faces)
+        if cache is not None:
+            cache.put(key, *result)
+    vmapping, indices, uvs = result
 
     mesh.vertices = mesh.vertices[vmapping]
     mesh.faces = indices
@@ -34,7 +34,8 @@ import yaml
 from .attention_blocks import FourierEmbedder, Transformer, CrossAttentionDecoder, PointCrossAttentionEncoder
 from .surface_extractors import MCSurfaceExtractor, SurfaceExtractors
 from .volume_decoders import VanillaVolumeDecoder, FlashVDMVolumeDecoding, HierarchicalVolumeDecoding
-from ...utils import logger, synchronize_timer, smart_load_model
+from ...utils import logger, synchronize_timer, smart_load_model, load_safetensors_lazily
+from ...utils import init_empty_weights, load_state_dict_assign, get_default_device, get_default_dtype
 
 
 class DiagonalGaussianDistribution(object):
@@ -123,11 +124,14 @@ class VectsetVAE(nn.Module):
         cls,
         ckpt_path,
         config_path,
-        device='cuda',
-        dtype=torch.float16,
+        device=None,
+        dtype=None,
         use_safetensors=None,
         **kwargs,
     ):
+        device = device or get_default_device()
+        dtype = dtype or get_default_dtype(device)
+
         # load config
         with open(config_path, 'r') as f:
             config = yaml.safe_load(f)
@@ -139,17 +143,20 @@ class VectsetVAE(nn.Module):
             raise FileNotFoundError(f"Model file {ckpt_path} not found")
 
         logger.info(f"Loading model from {ckpt_path}")
-        if use_safetensors:
-            import safetensors.torch
-            ckpt = safetensors.torch.load_file(ckpt_path, device='cpu')
-        else:
-            ckpt = torch.load(ckpt_path, map_location='cpu', weights_only=True)
-
         model_kwargs = config['params']
         model_kwargs.update(kwargs)
 
-        model = cls(**model_kwargs)
-        model.load_state_dict(ckpt)
+        if use_safetensors:
+            # mmap the file and read the tensors directly on the target device, then let the meta
+            # parameters of the model adopt them so the weights are materialized only once
+            ckpt = load_safetensors_lazily(ckpt_path, device=device, dtype=dtype)
+            with torch.device(device), init_empty_weights():
+                model = cls(**model_kwargs)
+            load_state_dict_assign(model, ckpt, device)
+        else:
+            ckpt = torch.load(ckpt_path, map_location='cpu', weights_only=True)
+            model = cls(**model_kwargs)
+            model.load_state_dict(ckpt)
         model.to(device=device, dtype=dtype)
         return model
 
@@ -157,8 +164,8 @@ class VectsetVAE(nn.Module):
     def from_pretrained(
         cls,
         model_path,
-        device='cuda',
-        dtype=torch.float16,
+        device=None,
+        dtype=None,
         use_safetensors=False,
         variant='fp16',
         subfolder='hunyuan3d-vae-v2-1',
@@ -256,7 +256,7 @@ class SingleImageEncoder(nn.Module):
         if self.disable_drop:
             return outputs
         else:
-            random_p = torch.rand(len(image), device='cuda')
+            random_p = torch.rand(len(image), device=image.device)
             remain_bool_tensor = random_p > self.drop_ratio
             outputs['main'] *= remain_bool_tensor.view(-1,1,1)
         return outputs
@@ -33,7 +33,8 @@ import torch.nn.functional as F
 from einops import rearrange
 
 from .moe_layers import MoEBlock
-from ...utils import logger, synchronize_timer, smart_load_model
+from ...utils import logger, synchronize_timer, smart_load_model, sdpa_kernel_context
+from ...utils import get_default_device, get_default_dtype
 
 
 def modulate(x, shift, scale):
@@ -212,22 +213,14 @@ class CrossAttention(nn.Module):
         q = self.q_norm(q)
         k = self.k_norm(k)
 
-        with torch.backends.cuda.sdp_kernel(
-            enable_flash=True,
-            enable_math=False,
-            enable_mem_efficient=True
-        ):
+        with sdpa_kernel_context(q.device):
             q, k, v = map(lambda t: rearrange(t, 'b n h d -> b h n d', h=self.num_heads), (q, k, v))
             context = F.scaled_dot_product_attention(
                 q, k, v
             ).transpose(1, 2).reshape(b, s1, -1)
 
         if self.with_dca:
-            with torch.backends.cuda.sdp_kernel(
-                enable_flash=True,
-                enable_math=False,
-                enable_mem_efficient=True
-            ):
+            with sdpa_kernel_context(q.device):
                 k_dca, v_dca = map(lambda t: rearrange(t, 'b n h d -> b h n d', h=self.num_heads),
                                    (k_dca, v_dca))
                 context_dca = F.scaled_dot_product_attention(
@@ -289,11 +282,7 @@ class Attention(nn.Module):
         q = self.q_norm(q)  # [b, h, s, d]
         k = self.k_norm(k)  # [b, h, s, d]
 
-        with torch.backends.cuda.sdp_kernel(
-            enable_flash=True,
-            enable_math=False,
-            enable_mem_efficient=True
-        ):
+        with sdpa_kernel_context(q.device):
             x = F.scaled_dot_product_attention(q, k, v)
             x = x.transpose(1, 2).reshape(B, N, -1)
 
@@ -473,11 +462,14 @@ class HunYuanDiTPlain(nn.Module):
         cls,
         ckpt_path,
         config_path,
-        device='cuda',
-        dtype=torch.float16,
+        device=None,
+        dtype=None,
         use_safetensors=None,
         **kwargs,
     ):
+        device = device or get_default_device()
+        dtype = dtype or get_default_dtype(device)
+
         # load config
         with open(config_path, 'r') as f:
             config = yaml.safe_load(f)
@@ -512,8 +504,8 @@ class HunYuanDiTPlain(nn.Module):
     def from_pretrained(
         cls,
         model_path,
-        device='cuda',
-        dtype=torch.float16,
+        device=None,
+        dtype=None,
         use_safetensors=False,
         variant='fp16',
         subfolder='hunyuan3d-dit-v2-1',
@@ -112,9 +112,17 @@ class MoEGate(nn.Module):
 class MoEBlock(nn.Module):
     def __init__(self, dim, num_experts=8, moe_top_k=2,
                     activation_fn = "gelu", dropout=0.0, final_dropout = False, 
-                    ff_inner_dim = None, ff_bias = True):
+                    ff_inner_dim = None, ff_bias = True, capacity_factor=None, capacity_overflow="drop"):
         super().__init__()
         self.moe_top_k = moe_top_k
+        # None sizes the expert batches for the worst case (every token): one round, exact and without host sync.
+        # A float bounds them to that multiple of the balanced load, and `capacity_overflow` decides what happens
+        # to the assignments beyond it: "drop" them (one round, no host sync) or "retry" them in further rounds
+        # (exact, one host read of the overflow flag per round)
+        if capacity_overflow not in ("drop", "retry"):
+            raise ValueError(f"Unknown capacity_overflow {capacity_overflow}, available: ('drop', 'retry')")
+        self.capacity_factor = capacity_factor
+        self.capacity_overflow = capacity_overflow
         self.experts = nn.ModuleList([
                 FeedForward(dim,dropout=dropout, 
                             activation_fn=activation_fn,  
@@ -127,6 +135,9 @@ class MoEBlock(nn.Module):
         self.shared_experts = FeedForward(dim,dropout=dropout, activation_fn=activation_fn,  
                                           final_dropout=final_dropout,  inner_dim=ff_inner_dim,  
                                           bias=ff_bias)
+        self._stacked_experts = None
+        # loading may replace the expert parameters (e.g. `assign=True`), stack the new ones on next use
+        self.register_load_state_dict_post_hook(MoEBlock._reset_after_load)
 
     def initialize_weight(self):
         pass
@@ -139,39 +150,136 @@ class MoEBlock(nn.Module):
         hidden_states = hidden_states.view(-1, hidden_states.shape[-1])
         flat_topk_idx = topk_idx.view(-1)
         if self.training:
-            hidden_states = hidden_states.repeat_interleave(self.moe_top_k, dim=0)
-            y = torch.empty_like(hidden_states, dtype=hidden_states.dtype)
-            for i, expert in enumerate(self.experts): 
-                tmp = expert(hidden_states[flat_topk_idx == i])
-                y[flat_topk_idx == i] = tmp.to(hidden_states.dtype)
-            y = (y.view(*topk_weight.shape, -1) * topk_weight.unsqueeze(-1)).sum(dim=1)
-            y =  y.view(*orig_shape)
+            y = self.moe_dispatch(hidden_states, flat_topk_idx, topk_weight.view(-1, 1)).view(*orig_shape)
             y = AddAuxiliaryLoss.apply(y, aux_loss)
         else:
             y = self.moe_infer(hidden_states, flat_topk_idx, topk_weight.view(-1, 1)).view(*orig_shape)
         y = y + self.shared_experts(identity)
         return y
-    
+
+    def _apply(self, fn, *args, **kwargs):
+        # `.to()` and friends give the experts new tensors, stack those on next use
+        module = super()._apply(fn, *args, **kwargs)
+        self.reset_stacked_experts()
+        return module
+
+    @staticmethod
+    def _reset_after_load(module, incompatible_keys):
+        module.reset_stacked_experts()
+
+    def reset_stacked_experts(self):
+        """Drop the stacked expert weights, e.g. after the expert layers were replaced or quantized."""
+        self._stacked_experts = None
+
+    def expert_capacity(self, num_tokens):
+        if self.capacity_factor is None:
+            # top-k experts are distinct, so an expert never receives more than `num_tokens` tokens
+            return num_tokens
+        capacity = math.ceil(self.capacity_factor * num_tokens * self.moe_top_k / len(self.experts))
+        return max(1, min(num_tokens, capacity))
+
+    def moe_dispatch(self, x, flat_expert_indices, flat_expert_weights):
+        """
+        Route tokens to experts in padded [num_experts, capacity] batches with static shapes.
+
+        By default every expert batch can hold the whole sequence, so a single round is exact and never
+        synchronizes with the host. With `capacity_factor` the batches are bounded to that multiple of the
+        balanced load, and assignments overflowing them are dropped, or with `capacity_overflow="retry"`
+        dispatched again in further rounds, each costing one host read of the overflow flag.
+        """
+        num_tokens = x.shape[0]
+        capacity = self.expert_capacity(num_tokens)
+        token_idxs = torch.arange(num_tokens * self.moe_top_k, device=x.device) // self.moe_top_k
+        pending = torch.ones_like(flat_expert_indices, dtype=torch.bool)
+        y = None
+        while True:
+            round_y, pending = self._dispatch_round(
+                x, flat_expert_indices, flat_expert_weights, token_idxs, pending, capacity
+            )
+            y = round_y if y is None else y + round_y
+            if capacity >= num_tokens or self.capacity_overflow == "drop" or not bool(pending.any()):
+                return y
+
+    def _dispatch_round(self, x, flat_expert_indices, flat_expert_weights, token_idxs, pending, capacity):
+        """Run the pending assignments that fit in the expert batches, returns (output, still pending)."""
+        num_experts = len(self.experts)
+        num_tokens, dim = x.shape
+
+        # position of each pending assignment inside its expert batch, in token order
+        one_hot = F.one_hot(flat_expert_indices, num_experts) * pending.unsqueeze(-1)
+        position = ((one_hot.cumsum(0) - 1) * one_hot).sum(-1)
+        keep = pending & (position < capacity)
+        # other assignments go to a trailing dummy slot that is never read back with a non-zero weight
+        slots = torch.where(keep, flat_expert_indices * capacity + position,
+                            torch.full_like(position, num_experts * capacity))
+
+        expert_in = x.new_zeros(num_experts * capacity + 1, dim)
+        expert_in[slots] = x[token_idxs]
+        expert_in = expert_in[:-1].view(num_experts, capacity, dim)
+
+        if not self.training and self._batchable_experts():
+            expert_out = self.batched_experts(expert_in)
+        else:
+            expert_out = torch.stack([expert(expert_in[i]) for i, expert in enumerate(self.experts)])
+        expert_out = torch.cat([expert_out.reshape(-1, dim), expert_out.new_zeros(1, dim)])
+
+        weights = flat_expert_weights.view(-1, 1) * keep.view(-1, 1)
+        contrib = expert_out[slots] * weights.to(expert_out.dtype)
+        return contrib.new_zeros(num_tokens, dim).index_add(0, token_idxs, contrib), pending & ~keep
 
     @torch.no_grad()
     def moe_infer(self, x, flat_expert_indices, flat_expert_weights):
-        expert_cache = torch.zeros_like(x) 
-        idxs = flat_expert_indices.argsort()
-        tokens_per_expert = flat_expert_indices.bincount().cpu().numpy().cumsum(0)
-        token_idxs = idxs // self.moe_top_k 
-        for i, end_idx in enumerate(tokens_per_expert):
-            start_idx = 0 if i == 0 else tokens_per_expert[i-1]
-            if start_idx == end_idx:
-                continue
-            expert = self.experts[i]
-            exp_token_idx = token_idxs[start_idx:end_idx]
-            expert_tokens = x[exp_token_idx]
-            expert_out = expert(expert_tokens)
-            expert_out.mul_(flat_expert_weights[idxs[start_idx:end_idx]]) 
-            
-            # for fp16 and other dtype
-            expert_cache = expert_cache.to(expert_out.dtype)
-            expert_cache.scatter_reduce_(0, exp_token_idx.view(-1, 1).repeat(1, x.shape[-1]),
-                                         expert_out, 
-                                         reduce='sum')
-        return expert_cache
+        return self.moe_dispatch(x, flat_expert_indices, flat_expert_weights)
+
+    def _can_batch_experts(self):
+        for expert in self.experts:
+            act, out = expert.net[0], expert.net[2]
+            # plain `GELU -> Linear` experts only, e.g. not GEGLU or quantized linear layers
+            if type(getattr(act, 'proj', None)) is not nn.Linear or not hasattr(act, 'approximate'):
+                return False
+            if type(out) is not nn.Linear:
+                return False
+            if act.proj.bias is None or out.bias is None:
+                return False
+        return True
+
+    def _batchable_experts(self):
+        """Whether the batched path applies, stacking the expert weights on first use."""
+        # checked on every call, the expert layers may have been replaced (e.g. quantized) since stacking
+        if not self._can_batch_experts():
+            self._stacked_experts = None
+            return False
+        if self._stacked_experts is None:
+            self.stack_expert_weights()
+        return self._stacked_experts is not None
+
+    @torch.no_grad()
+    def stack_expert_weights(self):
+        """
+        Stack the expert weights for `batched_experts`, and re-point the expert parameters at the stacked
+        storage so the weights are not held twice. Weights viewing memory the module does not own, e.g. a
+        shared weight mapping, are left in place and the experts run one by one instead of copying them.
+        """
+        self._stacked_experts = None
+        if not self._can_batch_experts():
+            return
+        params = [
+            (expert.net[0].proj.weight, expert.net[0].proj.bias, expert.net[2].weight, expert.net[2].bias)
+            for expert in self.experts
+        ]
+        if any(p.is_meta or not p.untyped_storage().resizable() for expert_params in params for p in expert_params):
+            return
+        # first use is typically under `torch.inference_mode`, keep the parameters normal tensors regardless
+        with torch.inference_mode(False):
+            stacked = [torch.stack([expert_params[j] for expert_params in params]) for j in range(4)]
+        for i, expert_params in enumerate(params):
+            for j, p in enumerate(expert_params):
+                p.data = stacked[j][i]
+        self._stacked_experts = stacked
+
+    def batched_experts(self, x):
+        """Run all experts as two batched matmuls over stacked weights, x: [num_experts, capacity, dim]."""
+        w1, b1, w2, b2 = self._stacked_experts
+        h = torch.baddbmm(b1.unsqueeze(1), x, w1.transpose(1, 2))
+        h = F.gelu(h, approximate=self.experts[0].net[0].approximate)
+        return torch.baddbmm(b2.unsqueeze(1), h, w2.transpose(1, 2))
@@ -11,6 +11,7 @@ from pytorch_lightning.utilities import rank_zero_only
 
 from ...utils.ema import LitEma
 from ...utils.misc import instantiate_from_config, instantiate_non_trainable_model
+from ...utils.utils import autocast_context
 
 
 
@@ -254,10 +255,10 @@ class Diffuser(pl.LightningModule):
         pl.seed_everything(self.trainer.global_rank)
 
     def forward(self, batch):
-        with torch.autocast(device_type="cuda", dtype=torch.bfloat16): #float32 for text
+        with torch.autocast(device_type=self.device.type, dtype=torch.bfloat16): #float32 for text
             contexts = self.cond_stage_model(image=batch.get('image'), text=batch.get('text'), mask=batch.get('mask'))
 
-        with torch.autocast(device_type="cuda", dtype=torch.float16):
+        with autocast_context(self.device):
             with torch.no_grad():
                 latents = self.first_stage_model.encode(batch[self.first_stage_key], sample_posterior=True)
                 latents = self.z_scale_factor * latents
@@ -284,7 +285,7 @@ class Diffuser(pl.LightningModule):
                 # else:
                 #     mesh.export(f"check_{time.time()}.glb")
                 
-        with torch.autocast(device_type="cuda", dtype=torch.bfloat16):
+        with torch.autocast(device_type=self.device.type, dtype=torch.bfloat16):
             loss = self.transport.training_losses(self.model, latents, dict(contexts=contexts))["loss"].mean()
         return loss
 
@@ -319,7 +320,7 @@ class Diffuser(pl.LightningModule):
         generator = torch.Generator().manual_seed(0)
 
         with self.ema_scope("Sample"):
-            with torch.amp.autocast(device_type='cuda'):
+            with autocast_context(self.device):
                 try:
                     self.pipeline.device = self.device
                     self.pipeline.dtype = self.dtype
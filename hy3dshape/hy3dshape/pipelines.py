@@ -30,6 +30,9 @@ from tqdm import tqdm
 from .models.autoencoders import ShapeVAE
 from .models.autoencoders import SurfaceExtractors
 from .utils import logger, synchronize_timer, smart_load_model
+from .utils import load_safetensors_lazily, safetensors_prefixes, init_empty_weights, load_state_dict_assign
+from .utils import get_default_device, get_default_dtype, autocast_context
+from .utils.quantization import quantize_pipeline
 
 
 def retrieve_timesteps(
@@ -127,6 +130,18 @@ def instantiate_from_config(config, **kwargs):
     return instance
 
 
+def read_checkpoint_component(ckpt_path, name, use_safetensors, dtype):
+    """Read the `name` component (e.g. `model`, `vae`) of a checkpoint to CPU, None if it is not stored."""
+    if use_safetensors:
+        if name not in safetensors_prefixes(ckpt_path):
+            return None
+        return load_safetensors_lazily(ckpt_path, prefix=name, device='cpu', dtype=dtype)
+    state_dict = torch.load(ckpt_path, map_location='cpu', weights_only=True, mmap=True).get(name)
+    if state_dict is None:
+        return None
+    return {key: value.to(dtype) if value.is_floating_point() else value for key, value in state_dict.items()}
+
+
 class Hunyuan3DDiTPipeline:
     model_cpu_offload_seq = "conditioner->model->vae"
     _exclude_from_cpu_offload = []
@@ -137,11 +152,17 @@ class Hunyuan3DDiTPipeline:
         cls,
         ckpt_path,
         config_path,
-        device='cuda',
-        dtype=torch.float16,
+        device=None,
+        dtype=None,
         use_safetensors=None,
+        lazy_load=True,
+        quantization=None,
+        shared_weights=None,
         **kwargs,
     ):
+        device = device or get_default_device()
+        dtype = dtype or get_default_dtype(device)
+
         # load config
         with open(config_path, 'r') as f:
             config = yaml.safe_load(f)
@@ -153,27 +174,74 @@ class Hunyuan3DDiTPipeline:
             raise FileNotFoundError(f"Model file {ckpt_path} not found")
         logger.info(f"Loading model from {ckpt_path}")
 
-        if use_safetensors:
-            # parse safetensors
-            import safetensors.torch
-            safetensors_ckpt = safetensors.torch.load_file(ckpt_path, device='cpu')
-            ckpt = {}
-            for key, value in safetensors_ckpt.items():
-                model_name = key.split('.')[0]
-                new_key = key[len(model_name) + 1:]
-                if model_name not in ckpt:
-                    ckpt[model_name] = {}
-                ckpt[model_name][new_key] = value
+        component_state_dict = None
+        if shared_weights is not None:
+            # load from the host-wide store, the checkpoint is only read by the first worker to export it
+            dtype_name = str(dtype).split('.')[-1]
+            keys = {
+                name: shared_weights.key(f'{name}.{dtype_name}', ckpt_path)
+                for name in ('model', 'vae', 'conditioner')
+            }
+            if keys['model'] not in shared_weights:
+                # the DiT goes last, its export marks the checkpoint as fully published for other workers
+                for name in ('vae', 'conditioner', 'model'):
+                    state_dict = read_checkpoint_component(ckpt_path, name, use_safetensors, dtype)
+                    if state_dict is not None:
+                        shared_weights.publish(keys[name], state_dict)
+                    del state_dict
+
+            def component_state_dict(name):
+                if keys[name] not in shared_weights:
+                    return None
+                return shared_weights.load_state_dict(keys[name], device=device, dtype=dtype)
+        elif use_safetensors and lazy_load:
+            # mmap the file and read each component's tensors straight onto the target device
+            prefixes = safetensors_prefixes(ckpt_path)
+
+            def component_state_dict(name):
+                if name not in prefixes:
+                    return None
+                return load_safetensors_lazily(ckpt_path, prefix=name, device=device, dtype=dtype)
+
+        if component_state_dict is not None:
+            # the modules are built with meta parameters that adopt the loaded tensors,
+            # so weights are materialized only once
+            with torch.device(device), init_empty_weights():
+                model = instantiate_from_config(config['model'])
+                vae = instantiate_from_config(config['vae'])
+            load_state_dict_assign(model, component_state_dict('model'), device)
+            load_state_dict_assign(vae, component_state_dict('vae'), device, strict=False)
+            conditioner_state_dict = component_state_dict('conditioner')
+            if conditioner_state_dict is not None:
+                with torch.device(device), init_empty_weights():
+                    conditioner = instantiate_from_config(config['conditioner'])
+                load_state_dict_assign(conditioner, conditioner_state_dict, device)
+            else:
+                # the conditioner keeps the (pretrained encoder) weights it builds itself
+                with torch.device(device):
+                    conditioner = instantiate_from_config(config['conditioner'])
         else:
-            ckpt = torch.load(ckpt_path, map_location='cpu', weights_only=True)
-        # load model
-        model = instantiate_from_config(config['model'])
-        model.load_state_dict(ckpt['model'])
-        vae = instantiate_from_config(config['vae'])
-        vae.load_state_dict(ckpt['vae'], strict=False)
-        conditioner = instantiate_from_config(config['conditioner'])
-        if 'conditioner' in ckpt:
-            conditioner.load_state_dict(ckpt['conditioner'])
+            if use_safetensors:
+                # parse safetensors
+                import safetensors.torch
+                safetensors_ckpt = safetensors.torch.load_file(ckpt_path, device='cpu')
+                ckpt = {}
+                for key, value in safetensors_ckpt.items():
+                    model_name = key.split('.')[0]
+                    new_key = key[len(model_name) + 1:]
+                    if model_name not in ckpt:
+                        ckpt[model_name] = {}
+                    ckpt[model_name][new_key] = value
+            else:
+                ckpt = torch.load(ckpt_path, map_location='cpu', weights_only=True)
+            # load model
+            model = instantiate_from_config(config['model'])
+            model.load_state_dict(ckpt['model'])
+            vae = instantiate_from_config(config['vae'])
+            vae.load_state_dict(ckpt['vae'], strict=False)
+            conditioner = instantiate_from_config(config['conditioner'])
+            if 'conditioner' in ckpt:
+                conditioner.load_state_dict(ckpt['conditioner'])
         image_processor = instantiate_from_config(config['image_processor'])
         scheduler = instantiate_from_config(config['scheduler'])
 
@@ -188,21 +256,29 @@ class Hunyuan3DDiTPipeline:
         )
         model_kwargs.update(kwargs)
 
-        return cls(
+        pipeline = cls(
             **model_kwargs
         )
+        if quantization is not None:
+            # `quantization` is a mode name or a dict of `quantize_pipeline` arguments
+            if isinstance(quantization, str):
+                quantization = dict(mode=quantization)
+            quantize_pipeline(pipeline, **quantization)
+        return pipeline
 
     @classmethod
     def from_pretrained(
         cls,
         model_path,
-        device='cuda',
-        dtype=torch.float16,
+        device=None,
+        dtype=None,
         use_safetensors=False,
         variant='fp16',
         subfolder='hunyuan3d-dit-v2-1',
         **kwargs,
     ):
+        device = device or get_default_device()
+        dtype = dtype or get_default_dtype(device)
         kwargs['from_pretrained_kwargs'] = dict(
             model_path=model_path,
             subfolder=subfolder,
@@ -233,18 +309,26 @@ class Hunyuan3DDiTPipeline:
         scheduler,
         conditioner,
         image_processor,
-        device='cuda',
-        dtype=torch.float16,
+        device=None,
+        dtype=None,
+        cpu_autocast=True,
         **kwargs
     ):
+        device = device or get_default_device()
+        dtype = dtype or get_default_dtype(device)
         self.vae = vae
         self.model = model
         self.scheduler = scheduler
         self.conditioner = conditioner
         self.image_processor = image_processor
+        self.cpu_autocast = cpu_autocast
         self.kwargs = kwargs
         self.to(device, dtype)
 
+    def autocast(self):
+        """bf16 autocast when running on CPU, a no-op on GPU where weights are already in half precision."""
+        return autocast_context(self.device, enabled=self.device.type == 'cpu' and self.cpu_autocast)
+
     def compile(self):
         self.vae = torch.compile(self.vae)
         self.model = torch.compile(self.model)
@@ -258,6 +342,9 @@ class Hunyuan3DDiTPipeline:
         mc_algo='mc',
         replace_vae=True,
     ):
+        if enabled and self.device.type == 'cpu' and mc_algo == 'dmc':
+            logger.warning('`dmc` surface extraction requires CUDA, falling back to `mc` on CPU')
+            mc_algo = 'mc'
         if enabled:
             model_path = self.kwargs['from_pretrained_kwargs']['model_path']
             turbo_vae_mapping = {
@@ -422,7 +509,8 @@ class Hunyuan3DDiTPipeline:
     @synchronize_timer('Encode cond')
     def encode_cond(self, image, additional_cond_inputs, do_classifier_free_guidance, dual_guidance):
         bsz = image.shape[0]
-        cond = self.conditioner(image=image, **additional_cond_inputs)
+        with self.autocast():
+            cond = self.conditioner(image=image, **additional_cond_inputs)
 
         if do_classifier_free_guidance:
             un_cond = self.conditioner.unconditional_embedding(bsz, **additional_cond_inputs)
@@ -614,7 +702,7 @@ class Hunyuan3DDiTPipeline:
             guidance_cond = self.get_guidance_scale_embedding(
                 guidance_scale_tensor, embedding_dim=self.model.guidance_cond_proj_dim
             ).to(device=device, dtype=latents.dtype)
-        with synchronize_timer('Diffusion Sampling'):
+        with synchronize_timer('Diffusion Sampling'), self.autocast():
             for i, t in enumerate(tqdm(timesteps, disable=not enable_pbar, desc="Diffusion Sampling:", leave=False)):
                 # expand the latents if we are doing classifier free guidance
                 if do_classifier_free_guidance:
@@ -667,17 +755,18 @@ class Hunyuan3DDiTPipeline:
         enable_pbar=True
     ):
         if not output_type == "latent":
-            latents = 1. / self.vae.scale_factor * latents
-            latents = self.vae(latents)
-            outputs = self.vae.latents2mesh(
-                latents,
-                bounds=box_v,
-                mc_level=mc_level,
-                num_chunks=num_chunks,
-                octree_resolution=octree_resolution,
-                mc_algo=mc_algo,
-                enable_pbar=enable_pbar,
-            )
+            with self.autocast():
+                latents = 1. / self.vae.scale_factor * latents
+                latents = self.vae(latents)
+                outputs = self.vae.latents2mesh(
+                    latents,
+                    bounds=box_v,
+                    mc_level=mc_level,
+                    num_chunks=num_chunks,
+                    octree_resolution=octree_resolution,
+                    mc_algo=mc_algo,
+                    enable_pbar=enable_pbar,
+                )
         else:
             outputs = latents
 
@@ -750,7 +839,7 @@ class Hunyuan3DDiTFlowMatchingPipeline(Hunyuan3DDiTPipeline):
             guidance = torch.tensor([guidance_scale] * batch_size, device=device, dtype=dtype)
             # logger.info(f'Using guidance embed with scale {guidance_scale}')
 
-        with synchronize_timer('Diffusion Sampling'):
+        with synchronize_timer('Diffusion Sampling'), self.autocast():
             for i, t in enumerate(tqdm(timesteps, disable=not enable_pbar, desc="Diffusion Sampling:")):
                 # expand the latents if we are doing classifier free guidance
                 if do_classifier_free_guidance:
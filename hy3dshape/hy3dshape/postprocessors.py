@@ -13,8 +13,9 @@
 # by Tencent in accordance with TENCENT HUNYUAN COMMUNITY LICENSE AGREEMENT.
 
 import os
-import tempfile
-from typing import Union
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Union
 
 import numpy as np
 import pymeshlab
@@ -22,7 +23,7 @@ import torch
 import trimesh
 
 from .models.autoencoders import Latent2MeshOutput
-from .utils import synchronize_timer
+from .utils import logger, synchronize_timer
 
 
 def load_mesh(path):
@@ -34,7 +35,7 @@ def load_mesh(path):
     return mesh
 
 
-def reduce_face(mesh: pymeshlab.MeshSet, max_facenum: int = 200000):
+def reduce_face(mesh: pymeshlab.MeshSet, max_facenum: int = 200000, preserve_boundary: bool = True):
     if max_facenum > mesh.current_mesh().face_number():
         return mesh
 
@@ -42,7 +43,7 @@ def reduce_face(mesh: pymeshlab.MeshSet, max_facenum: int = 200000):
         "meshing_decimation_quadric_edge_collapse",
         targetfacenum=max_facenum,
         qualitythr=1.0,
-        preserveboundary=True,
+        preserveboundary=preserve_boundary,
         boundaryweight=3,
         preservenormal=True,
         preservetopology=True,
@@ -59,43 +60,45 @@ def remove_floater(mesh: pymeshlab.MeshSet):
     return mesh
 
 
+def remove_degenerate_face(mesh: pymeshlab.MeshSet):
+    mesh.apply_filter("meshing_remove_duplicate_faces")
+    mesh.apply_filter("meshing_remove_null_faces")
+    mesh.apply_filter("meshing_remove_unreferenced_vertices")
+    return mesh
+
+
 def pymeshlab2trimesh(mesh: pymeshlab.MeshSet):
-    with tempfile.NamedTemporaryFile(suffix='.ply', delete=False) as temp_file:
-        mesh.save_current_mesh(temp_file.name)
-        mesh = trimesh.load(temp_file.name)
-    # 检查加载的对象类型
-    if isinstance(mesh, trimesh.Scene):
-        combined_mesh = trimesh.Trimesh()
-        # 如果是Scene，遍历所有的geometry并合并
-        for geom in mesh.geometry.values():
-            combined_mesh = trimesh.util.concatenate([combined_mesh, geom])
-        mesh = combined_mesh
+    current_mesh = mesh.current_mesh()
+    mesh = trimesh.Trimesh(
+        vertices=current_mesh.vertex_matrix(),
+        faces=current_mesh.face_matrix(),
+    )
     return mesh
 
 
 def trimesh2pymeshlab(mesh: trimesh.Trimesh):
-    with tempfile.NamedTemporaryFile(suffix='.ply', delete=False) as temp_file:
-        if isinstance(mesh, trimesh.scene.Scene):
-            for idx, obj in enumerate(mesh.geometry.values()):
-                if idx == 0:
-                    temp_mesh = obj
-                else:
-                    temp_mesh = temp_mesh + obj
-            mesh = temp_mesh
-        mesh.export(temp_file.name)
-        mesh = pymeshlab.MeshSet()
-        mesh.load_new_mesh(temp_file.name)
-    return mesh
+    if isinstance(mesh, trimesh.scene.Scene):
+        mesh = trimesh.util.concatenate(list(mesh.geometry.values()))
+    ms = pymeshlab.MeshSet()
+    ms.add_mesh(to_pymeshlab_mesh(mesh.vertices, mesh.faces), "converted_mesh")
+    return ms
+
+
+def to_pymeshlab_mesh(vertices, faces):
+    # pymeshlab only accepts float64 vertices and int32 faces
+    return pymeshlab.Mesh(
+        vertex_matrix=np.ascontiguousarray(vertices, dtype=np.float64),
+        face_matrix=np.ascontiguousarray(faces, dtype=np.int32),
+    )
 
 
 def export_mesh(input, output):
     if isinstance(input, pymeshlab.MeshSet):
         mesh = output
     elif isinstance(input, Latent2MeshOutput):
-        output = Latent2MeshOutput()
-        output.mesh_v = output.current_mesh().vertex_matrix()
-        output.mesh_f = output.current_mesh().face_matrix()
-        mesh = output
+        mesh = Latent2MeshOutput()
+        mesh.mesh_v = output.current_mesh().vertex_matrix()
+        mesh.mesh_f = output.current_mesh().face_matrix()
     else:
         mesh = pymeshlab2trimesh(output)
     return mesh
@@ -105,8 +108,8 @@ def import_mesh(mesh: Union[pymeshlab.MeshSet, trimesh.Trimesh, Latent2MeshOutpu
     if isinstance(mesh, str):
         mesh = load_mesh(mesh)
     elif isinstance(mesh, Latent2MeshOutput):
+        mesh_pymeshlab = to_pymeshlab_mesh(mesh.mesh_v, mesh.mesh_f)
         mesh = pymeshlab.MeshSet()
-        mesh_pymeshlab = pymeshlab.Mesh(vertex_matrix=mesh.mesh_v, face_matrix=mesh.mesh_f)
         mesh.add_mesh(mesh_pymeshlab, "converted_mesh")
 
     if isinstance(mesh, (trimesh.Trimesh, trimesh.scene.Scene)):
@@ -123,10 +126,13 @@ class FaceReducer:
         max_facenum: int = 40000
     ) -> Union[pymeshlab.MeshSet, trimesh.Trimesh]:
         ms = import_mesh(mesh)
-        ms = reduce_face(ms, max_facenum=max_facenum)
+        ms = self.apply(ms, max_facenum=max_facenum)
         mesh = export_mesh(mesh, ms)
         return mesh
 
+    def apply(self, ms: pymeshlab.MeshSet, max_facenum: int = 40000) -> pymeshlab.MeshSet:
+        return reduce_face(ms, max_facenum=max_facenum)
+
 
 class FloaterRemover:
     @synchronize_timer('FloaterRemover')
@@ -135,10 +141,13 @@ class FloaterRemover:
         mesh: Union[pymeshlab.MeshSet, trimesh.Trimesh, Latent2MeshOutput, str],
     ) -> Union[pymeshlab.MeshSet, trimesh.Trimesh, Latent2MeshOutput]:
         ms = import_mesh(mesh)
-        ms = remove_floater(ms)
+        ms = self.apply(ms)
         mesh = export_mesh(mesh, ms)
         return mesh
 
+    def apply(self, ms: pymeshlab.MeshSet) -> pymeshlab.MeshSet:
+        return remove_floater(ms)
+
 
 class DegenerateFaceRemover:
     @synchronize_timer('DegenerateFaceRemover')
@@ -147,16 +156,114 @@ class DegenerateFaceRemover:
         mesh: Union[pymeshlab.MeshSet, trimesh.Trimesh, Latent2MeshOutput, str],
     ) -> Union[pymeshlab.MeshSet, trimesh.Trimesh, Latent2MeshOutput]:
         ms = import_mesh(mesh)
+        ms = self.apply(ms)
+        mesh = export_mesh(mesh, ms)
+        return mesh
 
-        with tempfile.NamedTemporaryFile(suffix='.ply', delete=False) as temp_file:
-            ms.save_current_mesh(temp_file.name)
-            ms = pymeshlab.MeshSet()
-            ms.load_new_mesh(temp_file.name)
+    def apply(self, ms: pymeshlab.MeshSet) -> pymeshlab.MeshSet:
+        return remove_degenerate_face(ms)
+
+
+class MeshCleanupChain:
+    """
+    Run several cleanup ops in a single pymeshlab session.
+
+    The input is converted to a `MeshSet` once, every op filters that same `MeshSet` through its
+    `apply` method, and the result is converted back once. Ops are post-processor instances, or
+    `(op, kwargs)` pairs for ops taking arguments. A call can run a subset of the ops, selected by
+    class name with `only`. The duration of each op is logged, and returned with the mesh when
+    `return_timings` is set.
+
+    Example:
+        chain = MeshCleanupChain([FloaterRemover(), DegenerateFaceRemover(), (FaceReducer(), dict(max_facenum=40000))])
+        mesh = chain(mesh)
+        mesh, timings = chain(mesh, return_timings=True)
+        mesh = chain(mesh, only=['FaceReducer'], FaceReducer=dict(max_facenum=10000))
+    """
+
+    def __init__(self, ops):
+        self.ops = [op if isinstance(op, tuple) else (op, {}) for op in ops]
 
+    @synchronize_timer('MeshCleanupChain')
+    def __call__(
+        self,
+        mesh: Union[pymeshlab.MeshSet, trimesh.Trimesh, Latent2MeshOutput, str],
+        return_timings: bool = False,
+        only: Optional[List[str]] = None,
+        **op_kwargs,
+    ):
+        """`op_kwargs` maps an op class name to keyword arguments overriding the ones given at construction."""
+        # local to the call, the chain is shared by concurrent requests
+        timings = {}
+        start = time.time()
+        ms = import_mesh(mesh)
+        timings['import'] = time.time() - start
+        for op, kwargs in self.ops:
+            name = op.__class__.__name__
+            if only is not None and name not in only:
+                continue
+            kwargs = {**kwargs, **op_kwargs.get(name, {})}
+            start = time.time()
+            ms = op.apply(ms, **kwargs)
+            timings[name] = time.time() - start
+        start = time.time()
         mesh = export_mesh(mesh, ms)
+        timings['export'] = time.time() - start
+        logger.info('MeshCleanupChain: %s' % ', '.join(f'{name} {t:.3f}s' for name, t in timings.items()))
+        if return_timings:
+            return mesh, timings
         return mesh
 
 
+class LODGenerator:
+    """
+    Build several levels of detail of a mesh from one progressive decimation pass.
+
+    Face budgets are processed from the largest to the smallest, each level continuing the edge
+    collapses of the previous one in the same pymeshlab session, so N levels cost about as much as
+    a single decimation down to the smallest budget.
+
+    Example:
+        lods = LODGenerator()(mesh, [200000, 40000, 10000])
+        LODGenerator.export(lods, 'asset_lods.glb')
+    """
+
+    @synchronize_timer('LODGenerator')
+    def __call__(
+        self,
+        mesh: Union[pymeshlab.MeshSet, trimesh.Trimesh, Latent2MeshOutput, str],
+        face_counts: List[int],
+    ) -> List[trimesh.Trimesh]:
+        if isinstance(mesh, pymeshlab.MeshSet):
+            # decimate a copy, the cascade would otherwise reduce the caller's MeshSet in place
+            ms = pymeshlab.MeshSet()
+            ms.add_mesh(mesh.current_mesh())
+        else:
+            ms = import_mesh(mesh)
+        lods = {}
+        for face_count in sorted(set(face_counts), reverse=True):
+            ms = reduce_face(ms, max_facenum=face_count)
+            lods[face_count] = pymeshlab2trimesh(ms)
+        return [lods[face_count] for face_count in face_counts]
+
+    @staticmethod
+    def export(lods: List[trimesh.Trimesh], path: str):
+        """Write the levels as the nodes of one GLB when `path` ends with `.glb`, else as `lod{i}.glb` files in `path`."""
+        if path.endswith('.glb'):
+            scene = trimesh.Scene()
+            for i, lod in enumerate(lods):
+                name = f'lod{i}_{len(lod.faces)}'
+                scene.add_geometry(lod, node_name=name, geom_name=name)
+            scene.export(path)
+            return [path]
+        os.makedirs(path, exist_ok=True)
+        paths = []
+        for i, lod in enumerate(lods):
+            paths.append(os.path.join(path, f'lod{i}.glb'))
+            lod.export(paths[-1])
+        return paths
+
+
 def mesh_normalize(mesh):
     """
     Normalize mesh vertices to sphere
@@ -176,27 +283,64 @@ def mesh_normalize(mesh):
     return mesh
 
 
+def decimate_arrays(vertices: np.ndarray, faces: np.ndarray, max_facenum: int, preserve_boundary: bool = True):
+    """Quadric edge collapse decimation of a vertex / face array pair, returns the decimated arrays."""
+    ms = pymeshlab.MeshSet()
+    ms.add_mesh(to_pymeshlab_mesh(vertices, faces), "converted_mesh")
+    ms = reduce_face(ms, max_facenum=max_facenum, preserve_boundary=preserve_boundary)
+    return ms.current_mesh().vertex_matrix(), ms.current_mesh().face_matrix()
+
+
 class MeshSimplifier:
-    def __init__(self, executable: str = None):
-        if executable is None:
-            CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
-            executable = os.path.join(CURRENT_DIR, "mesh_simplifier.bin")
-        self.executable = executable
+    """
+    In-process quadric decimation of a trimesh to a target face count.
+
+    With `num_workers > 1` the connected components of the mesh are decimated in parallel, each
+    with a share of the face budget proportional to its size. Workers are processes since the
+    pymeshlab filters hold the GIL.
+    """
+
+    def __init__(
+        self,
+        executable: str = None,
+        *,
+        target_face_num: int = 40000,
+        preserve_boundary: bool = True,
+        num_workers: int = 1,
+    ):
+        if executable is not None:
+            logger.warning('MeshSimplifier no longer uses an external executable, `executable` is ignored')
+        self.target_face_num = target_face_num
+        self.preserve_boundary = preserve_boundary
+        self.num_workers = num_workers
 
     @synchronize_timer('MeshSimplifier')
     def __call__(
         self,
         mesh: Union[trimesh.Trimesh],
+        target_face_num: int = None,
     ) -> Union[trimesh.Trimesh]:
-        with tempfile.NamedTemporaryFile(suffix='.obj', delete=False) as temp_input:
-            with tempfile.NamedTemporaryFile(suffix='.obj', delete=False) as temp_output:
-                mesh.export(temp_input.name)
-                os.system(f'{self.executable} {temp_input.name} {temp_output.name}')
-                ms = trimesh.load(temp_output.name, process=False)
-                if isinstance(ms, trimesh.Scene):
-                    combined_mesh = trimesh.Trimesh()
-                    for geom in ms.geometry.values():
-                        combined_mesh = trimesh.util.concatenate([combined_mesh, geom])
-                    ms = combined_mesh
-                ms = mesh_normalize(ms)
-                return ms
+        if isinstance(mesh, trimesh.Scene):
+            mesh = trimesh.util.concatenate(list(mesh.geometry.values()))
+        target_face_num = target_face_num or self.target_face_num
+
+        components = [mesh]
+        if self.num_workers > 1:
+            components = mesh.split(only_watertight=False)
+        if len(components) > 1:
+            num_faces = len(mesh.faces)
+            budgets = [max(4, round(target_face_num * len(c.faces) / num_faces)) for c in components]
+            with ProcessPoolExecutor(max_workers=self.num_workers) as executor:
+                results = list(executor.map(
+                    decimate_arrays,
+                    [c.vertices for c in components],
+                    [c.faces for c in components],
+                    budgets,
+                    [self.preserve_boundary] * len(components),
+                ))
+            ms = trimesh.util.concatenate([trimesh.Trimesh(v, f, process=False) for v, f in results])
+        else:
+            vertices, faces = decimate_arrays(mesh.vertices, mesh.faces, target_face_num, self.preserve_boundary)
+            ms = trimesh.Trimesh(vertices, faces, process=False)
+        ms = mesh_normalize(ms)
+        return ms
@@ -3,3 +3,8 @@
 from .misc import get_config_from_file
 from .misc import instantiate_from_config
 from .utils import get_logger, logger, synchronize_timer, smart_load_model
+from .utils import load_safetensors_lazily, safetensors_prefixes, init_empty_weights, load_state_dict_assign
+from .utils import get_default_device, get_default_dtype, configure_cpu_inference
+from .utils import sdpa_kernel_context, autocast_context
+from .shared_weights import SharedWeightStore
+from .quantization import quantize_pipeline, quantize_linear_layers, quantization_error, LinearCalibrator
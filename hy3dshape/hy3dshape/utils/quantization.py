@@ -0,0 +1,218 @@
+# Hunyuan 3D is licensed under the TENCENT HUNYUAN NON-COMMERCIAL LICENSE AGREEMENT
+# except for the third-party components listed below.
+# Hunyuan 3D does not impose any additional limitations beyond what is outlined
+# in the repsective licenses of these third-party components.
+# Users must comply with all terms and conditions of original licenses of these third-party
+# components and must ensure that the usage of the third party components adheres to
+# all relevant laws and regulations.
+
+# For avoidance of doubts, Hunyuan 3D means the large language models and
+# their software and algorithms, including trained model weights, parameters (including
+# optimizer states), machine-learning model code, inference-enabling code, training-enabling code,
+# fine-tuning enabling code and other elements of the foregoing made publicly available
+# by Tencent in accordance with TENCENT HUNYUAN COMMUNITY LICENSE AGREEMENT.
+
+import fnmatch
+from typing import Dict, List, Optional
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from .utils import logger
+
+# Linear layers that are quantized by default, per pipeline component. The DiT embedders and
+# final layer, and the occupancy output projection of the geometry decoder, stay in full precision.
+DEFAULT_QUANTIZATION_ALLOWLIST = {
+    'model': ['blocks.*'],
+    'vae': ['geo_decoder.query_proj', 'geo_decoder.latents_proj', 'geo_decoder.cross_attn_decoder.*'],
+}
+
+QUANTIZATION_MODES = ('int8_weight_only', 'int8_dynamic')
+
+
+class Int8WeightOnlyLinear(nn.Module):
+    """ `nn.Linear` with int8 weights and per output channel scales.
+
+        Weights are dequantized to the activation dtype on the fly, so it runs on any device
+        and halves (fp16) or quarters (fp32) the weight memory.
+    """
+
+    def __init__(self, in_features, out_features, bias=True, device=None, dtype=None):
+        super().__init__()
+        self.in_features = in_features
+        self.out_features = out_features
+        self.register_buffer('weight_int8', torch.zeros(out_features, in_features, dtype=torch.int8, device=device))
+        self.register_buffer('weight_scale', torch.ones(out_features, 1, dtype=dtype, device=device))
+        if bias:
+            self.bias = nn.Parameter(torch.zeros(out_features, dtype=dtype, device=device), requires_grad=False)
+        else:
+            self.register_parameter('bias', None)
+
+    @classmethod
+    def from_float(cls, linear: nn.Linear):
+        weight = linear.weight.detach()
+        module = cls(linear.in_features, linear.out_features, bias=linear.bias is not None,
+                     device=weight.device, dtype=weight.dtype)
+        scale = weight.float().abs().amax(dim=1, keepdim=True).clamp(min=1e-8) / 127.
+        module.weight_int8.copy_(torch.round(weight.float() / scale).clamp(-127, 127).to(torch.int8))
+        module.weight_scale.copy_(scale.to(weight.dtype))
+        if linear.bias is not None:
+            module.bias.data.copy_(linear.bias.detach())
+        return module
+
+    def forward(self, x):
+        weight = self.weight_int8.to(x.dtype) * self.weight_scale.to(x.dtype)
+        bias = self.bias.to(x.dtype) if self.bias is not None else None
+        return F.linear(x, weight, bias)
+
+    def extra_repr(self):
+        return f'in_features={self.in_features}, out_features={self.out_features}, bias={self.bias is not None}'
+
+
+class Int8DynamicLinear(nn.Module):
+    """ CPU `nn.Linear` with int8 weights and activations quantized per batch at run time.
+
+        Wraps `torch.ao.nn.quantized.dynamic.Linear`, which only accepts fp32 inputs, so activations
+        coming from a bf16 autocast region are cast on the way in and out.
+    """
+
+    def __init__(self, linear: nn.Linear):
+        super().__init__()
+        from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+        from torch.ao.quantization import default_dynamic_qconfig
+
+        linear = linear.float().cpu()
+        linear.qconfig = default_dynamic_qconfig
+        self.linear = DynamicQuantizedLinear.from_float(linear)
+
+    @classmethod
+    def from_float(cls, linear: nn.Linear):
+        return cls(linear)
+
+    def forward(self, x):
+        return self.linear(x.float()).to(x.dtype)
+
+
+class LinearCalibrator:
+    """ Record the input abs-max of linear layers over a few calibration forward passes.
+
+        Layers whose activations exceed `outlier_threshold` are poor candidates for dynamic
+        activation quantization and can be excluded with `outliers()`.
+
+        Example:
+        ```python
+        with LinearCalibrator(pipeline.model) as calibrator:
+            pipeline(image=image, num_inference_steps=2, output_type='latent')
+        quantize_linear_layers(pipeline.model, 'int8_dynamic', exclude=calibrator.outliers(64.))
+        ```
+    """
+
+    def __init__(self, module: nn.Module):
+        self.module = module
+        self.stats: Dict[str, float] = {}
+        self._handles = []
+
+    def __enter__(self):
+        for name, child in self.module.named_modules():
+            if isinstance(child, nn.Linear):
+                self._handles.append(child.register_forward_pre_hook(self._make_hook(name)))
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        for handle in self._handles:
+            handle.remove()
+        self._handles = []
+
+    def _make_hook(self, name):
+        def hook(module, inputs):
+            absmax = inputs[0].detach().abs().max().item()
+            self.stats[name] = max(self.stats.get(name, 0.), absmax)
+
+        return hook
+
+    def outliers(self, outlier_threshold):
+        return [name for name, absmax in self.stats.items() if absmax > outlier_threshold]
+
+
+def _matches(name, patterns):
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+
+def quantize_linear_layers(
+    module: nn.Module,
+    mode: str = 'int8_weight_only',
+    allowlist: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+):
+    """ Replace the `nn.Linear` layers of `module` matching `allowlist` with int8 counterparts.
+
+        Args:
+            module (nn.Module): module to quantize in place.
+            mode (str): `int8_weight_only` (any device) or `int8_dynamic` (CPU only).
+            allowlist (List[str], optional): glob patterns over qualified module names, all linear layers if None.
+            exclude (List[str], optional): glob patterns of layers to keep in full precision,
+                e.g. the outliers found by `LinearCalibrator`.
+
+        Returns:
+            List[str]: names of the quantized layers.
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f'Unknown quantization mode {mode}, available: {QUANTIZATION_MODES}')
+    quant_cls = Int8WeightOnlyLinear if mode == 'int8_weight_only' else Int8DynamicLinear
+    exclude = exclude or []
+
+    targets = []
+    for name, child in module.named_modules():
+        if not isinstance(child, nn.Linear):
+            continue
+        if allowlist is not None and not _matches(name, allowlist):
+            continue
+        if _matches(name, exclude):
+            continue
+        targets.append(name)
+
+    for name in targets:
+        parent_name, _, child_name = name.rpartition('.')
+        parent = module.get_submodule(parent_name) if parent_name else module
+        setattr(parent, child_name, quant_cls.from_float(getattr(parent, child_name)))
+    # MoE blocks keep stacked copies of their expert weights for the batched path, drop the fp ones
+    for child in module.modules():
+        if hasattr(child, 'reset_stacked_experts'):
+            child.reset_stacked_experts()
+    logger.info(f'Quantized {len(targets)} linear layers of {module.__class__.__name__} to {mode}')
+    return targets
+
+
+def quantize_pipeline(pipeline, mode='int8_weight_only', allowlist=None, exclude=None):
+    """ Quantize the DiT and geometry decoder of a shape pipeline.
+
+        Args:
+            pipeline (Hunyuan3DDiTPipeline): pipeline to quantize in place.
+            mode (str): see `quantize_linear_layers`.
+            allowlist (Dict[str, List[str]], optional): per component patterns,
+                defaults to `DEFAULT_QUANTIZATION_ALLOWLIST`.
+            exclude (Dict[str, List[str]], optional): per component patterns to keep in full precision.
+    """
+    allowlist = DEFAULT_QUANTIZATION_ALLOWLIST if allowlist is None else allowlist
+    exclude = exclude or {}
+    if mode == 'int8_dynamic' and pipeline.device.type != 'cpu':
+        raise ValueError('`int8_dynamic` quantization is only supported on CPU, use `int8_weight_only` instead')
+    for component, patterns in allowlist.items():
+        quantize_linear_layers(getattr(pipeline, component), mode, patterns, exclude.get(component))
+    return pipeline
+
+
+def quantization_error(reference: torch.Tensor, quantized: torch.Tensor):
+    """ Regression metrics of a quantized output against its fp32 reference.
+
+        Returns:
+            dict: `max_abs` error and `rel_l2` error (||q - r|| / ||r||).
+    """
+    reference = reference.float()
+    quantized = quantized.float().to(reference.device)
+    diff = quantized - reference
+    return {
+        'max_abs': diff.abs().max().item(),
+        'rel_l2': (diff.norm() / reference.norm().clamp(min=1e-12)).item(),
+    }
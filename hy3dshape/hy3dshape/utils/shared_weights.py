@@ -0,0 +1,151 @@
+# Hunyuan 3D is licensed under the TENCENT HUNYUAN NON-COMMERCIAL LICENSE AGREEMENT
+# except for the third-party components listed below.
+# Hunyuan 3D does not impose any additional limitations beyond what is outlined
+# in the repsective licenses of these third-party components.
+# Users must comply with all terms and conditions of original licenses of these third-party
+# components and must ensure that the usage of the third party components adheres to
+# all relevant laws and regulations.
+
+# For avoidance of doubts, Hunyuan 3D means the large language models and
+# their software and algorithms, including trained model weights, parameters (including
+# optimizer states), machine-learning model code, inference-enabling code, training-enabling code,
+# fine-tuning enabling code and other elements of the foregoing made publicly available
+# by Tencent in accordance with TENCENT HUNYUAN COMMUNITY LICENSE AGREEMENT.
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import uuid
+
+import torch
+
+from .utils import logger
+
+_SAFETENSORS_DTYPES = {
+    'F64': torch.float64,
+    'F32': torch.float32,
+    'F16': torch.float16,
+    'BF16': torch.bfloat16,
+    'I64': torch.int64,
+    'I32': torch.int32,
+    'I16': torch.int16,
+    'I8': torch.int8,
+    'U8': torch.uint8,
+    'BOOL': torch.bool,
+}
+
+
+class SharedWeightStore:
+    """ Host-wide store of model weights that several worker processes can load from.
+
+        Each module is exported once to `<root>/<key>.safetensors`. Workers then memory-map the file
+        and build their state dicts as zero-copy views of the mapping, so the host keeps a single
+        copy of the weights in the page cache no matter how many workers use it, and workers started
+        after the first one never read or deserialize the original checkpoint. Keys carry a
+        fingerprint of the checkpoint files, so updated weights are exported again instead of
+        silently reusing a stale export.
+
+        Example:
+        ```python
+        store = SharedWeightStore('/dev/shm/hy3dgen')
+        key = store.key('shape_dit', ckpt_path)
+        state_dict = store.load(key, lambda: torch.load(ckpt_path)['model'], device='cuda')
+        ```
+    """
+
+    def __init__(self, root=None):
+        root = root or os.environ.get('HY3DGEN_SHARED_WEIGHTS', '~/.cache/hy3dgen/shared_weights')
+        self.root = os.path.expanduser(root)
+        os.makedirs(self.root, exist_ok=True)
+        self._mmaps = {}
+
+    @staticmethod
+    def fingerprint(*paths):
+        """Version hash of checkpoint files (directories are walked), from their path, size and mtime."""
+        digest = hashlib.sha256()
+        for path in paths:
+            path = os.path.abspath(path)
+            files = [path]
+            if os.path.isdir(path):
+                files = sorted(
+                    os.path.join(folder, name) for folder, _, names in os.walk(path) for name in names
+                )
+            for file in files:
+                stat = os.stat(file)
+                digest.update(f'{file}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+        return digest.hexdigest()[:16]
+
+    def key(self, name, *paths):
+        """Store key of `name` loaded from the checkpoint files `paths`."""
+        return f'{name}-{self.fingerprint(*paths)}'
+
+    def path(self, key):
+        return os.path.join(self.root, f'{key}.safetensors')
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def publish(self, key, state_dict):
+        """Export `state_dict` under `key` unless another worker already did."""
+        if key in self:
+            return self.path(key)
+        import safetensors.torch
+
+        # clone, since safetensors refuses tensors that share storage (e.g. tied or stacked weights)
+        state_dict = {
+            name: value.detach().to('cpu').clone()
+            for name, value in state_dict.items()
+        }
+        # write to a private file then rename, so concurrent workers never see a partial export
+        tmp_path = f'{self.path(key)}.{uuid.uuid4().hex}.tmp'
+        safetensors.torch.save_file(state_dict, tmp_path)
+        os.replace(tmp_path, self.path(key))
+        logger.info(f'Published shared weights {key} to {self.path(key)}')
+        return self.path(key)
+
+    def load_state_dict(self, key, device=None, dtype=None):
+        """ Return the state dict stored under `key`.
+
+            Tensors are views of the shared mapping, unless `device` or floating point `dtype` require a copy,
+            in which case only the copy on `device` is materialized.
+        """
+        if key not in self._mmaps:
+            with open(self.path(key), 'rb') as f:
+                # a private (copy-on-write) mapping shares pages with every other process until written
+                self._mmaps[key] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        buffer = self._mmaps[key]
+
+        header_size = struct.unpack('<Q', buffer[:8])[0]
+        header = json.loads(buffer[8:8 + header_size])
+        header.pop('__metadata__', None)
+        data_offset = 8 + header_size
+
+        state_dict = {}
+        for name, info in header.items():
+            tensor_dtype = _SAFETENSORS_DTYPES[info['dtype']]
+            begin, end = info['data_offsets']
+            if end == begin:
+                tensor = torch.empty(info['shape'], dtype=tensor_dtype)
+            else:
+                tensor = torch.frombuffer(
+                    buffer, dtype=tensor_dtype,
+                    count=(end - begin) // tensor_dtype.itemsize,
+                    offset=data_offset + begin,
+                ).view(info['shape'])
+            if dtype is not None and tensor.is_floating_point():
+                tensor = tensor.to(dtype)
+            if device is not None:
+                tensor = tensor.to(device)
+            state_dict[name] = tensor
+        return state_dict
+
+    def load(self, key, load_checkpoint, device=None, dtype=None):
+        """ State dict stored under `key`, see `load_state_dict`.
+
+            `load_checkpoint()` is only called to publish the weights when no worker has exported them yet.
+        """
+        if key not in self:
+            self.publish(key, load_checkpoint())
+        return self.load_state_dict(key, device=device, dtype=dtype)
@@ -12,8 +12,10 @@
 # fine-tuning enabling code and other elements of the foregoing made publicly available
 # by Tencent in accordance with TENCENT HUNYUAN COMMUNITY LICENSE AGREEMENT.
 
+import contextlib
 import logging
 import os
+import time
 from functools import wraps
 
 import torch
@@ -60,17 +62,24 @@ class synchronize_timer:
     def __enter__(self):
         """Context manager entry: start timing."""
         if os.environ.get('HY3DGEN_DEBUG', '0') == '1':
-            self.start = torch.cuda.Event(enable_timing=True)
-            self.end = torch.cuda.Event(enable_timing=True)
-            self.start.record()
+            self.use_cuda = torch.cuda.is_available()
+            if self.use_cuda:
+                self.start = torch.cuda.Event(enable_timing=True)
+                self.end = torch.cuda.Event(enable_timing=True)
+                self.start.record()
+            else:
+                self.start = time.perf_counter()
             return lambda: self.time
 
     def __exit__(self, exc_type, exc_value, exc_tb):
         """Context manager exit: stop timing and log results."""
         if os.environ.get('HY3DGEN_DEBUG', '0') == '1':
-            self.end.record()
-            torch.cuda.synchronize()
-            self.time = self.start.elapsed_time(self.end)
+            if self.use_cuda:
+                self.end.record()
+                torch.cuda.synchronize()
+                self.time = self.start.elapsed_time(self.end)
+            else:
+                self.time = (time.perf_counter() - self.start) * 1000
             if self.name is not None:
                 logger.info(f'{self.name} takes {self.time} ms')
 
@@ -86,6 +95,69 @@ class synchronize_timer:
         return wrapper
 
 
+_CPU_SDPA_MATH = True
+
+
+def get_default_device():
+    """Return `cuda` when a GPU is visible, otherwise fall back to `cpu`."""
+    return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+
+def get_default_dtype(device):
+    """Weights are kept in fp16 on GPU and in fp32 on CPU, where matmuls run under bf16 autocast."""
+    return torch.float16 if torch.device(device).type == 'cuda' else torch.float32
+
+
+def configure_cpu_inference(num_threads=None, num_interop_threads=None, sdpa_math=True):
+    """ Set up torch for CPU inference.
+
+        Args:
+            num_threads (int, optional): intra-op thread count, defaults to `HY3DGEN_CPU_THREADS` if set.
+            num_interop_threads (int, optional): inter-op thread count, only settable before any parallel work.
+            sdpa_math (bool): run scaled dot product attention with the math kernel on CPU.
+    """
+    global _CPU_SDPA_MATH
+    num_threads = num_threads or int(os.environ.get('HY3DGEN_CPU_THREADS', 0))
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+    if num_interop_threads:
+        try:
+            torch.set_num_interop_threads(num_interop_threads)
+        except RuntimeError:
+            logger.warning('Inter-op threads can only be set before any parallel work has started')
+    _CPU_SDPA_MATH = sdpa_math
+    logger.info(f'CPU inference uses {torch.get_num_threads()} threads, math sdpa: {sdpa_math}')
+
+
+def sdpa_kernel_context(device):
+    """Select the scaled dot product attention kernels for `device`.
+
+    On GPU flash / memory efficient kernels are required, on CPU the math kernel is used
+    (unless disabled with `configure_cpu_inference(sdpa_math=False)`).
+    """
+    if torch.device(device).type == 'cuda':
+        return torch.backends.cuda.sdp_kernel(
+            enable_flash=True,
+            enable_math=False,
+            enable_mem_efficient=True
+        )
+    if _CPU_SDPA_MATH:
+        return torch.backends.cuda.sdp_kernel(
+            enable_flash=False,
+            enable_math=True,
+            enable_mem_efficient=False
+        )
+    return contextlib.nullcontext()
+
+
+def autocast_context(device, dtype=None, enabled=True):
+    """Autocast for `device`, bf16 on CPU and fp16 on GPU unless `dtype` is given."""
+    device_type = torch.device(device).type
+    if dtype is None:
+        dtype = torch.bfloat16 if device_type == 'cpu' else torch.float16
+    return torch.autocast(device_type=device_type, dtype=dtype, enabled=enabled)
+
+
 def smart_load_model(
     model_path,
     subfolder,
@@ -126,3 +198,86 @@ def smart_load_model(
     config_path = os.path.join(model_path, 'config.yaml')
     ckpt_path = os.path.join(model_path, ckpt_name)
     return config_path, ckpt_path
+
+
+def load_safetensors_lazily(ckpt_path, prefix=None, device='cpu', dtype=None):
+    """ Load a (sub) state dict from a safetensors file without staging the whole file in host RAM.
+
+        The file is memory-mapped by `safetensors.safe_open`, and only tensors whose key starts with
+        `prefix.` are read. Each tensor is materialized directly on `device` (and cast to `dtype` if it
+        is floating point), with the prefix stripped from its key.
+
+        Example:
+        ```python
+        model.load_state_dict(load_safetensors_lazily('model.fp16.safetensors', 'model', device='cuda'))
+        ```
+    """
+    from safetensors import safe_open
+
+    device = torch.device(device)
+    # safetensors wants `cuda:0` rather than a bare `cuda`
+    if device.type == 'cuda' and device.index is None:
+        device = torch.device('cuda', torch.cuda.current_device())
+
+    state_dict = {}
+    with safe_open(ckpt_path, framework='pt', device=str(device)) as f:
+        for key in f.keys():
+            if prefix is not None:
+                if not key.startswith(prefix + '.'):
+                    continue
+                new_key = key[len(prefix) + 1:]
+            else:
+                new_key = key
+            tensor = f.get_tensor(key)
+            if dtype is not None and tensor.is_floating_point():
+                tensor = tensor.to(dtype)
+            state_dict[new_key] = tensor
+    return state_dict
+
+
+@contextlib.contextmanager
+def init_empty_weights():
+    """ Create the parameters of the modules built in this context on the `meta` device.
+
+        Each parameter is moved to `meta` as soon as it is registered, so building a module never holds more
+        than one layer of real weights and skips their random initialization. Buffers are created normally,
+        since non-persistent ones (e.g. Fourier or rotary tables) are not stored in checkpoints. Load the
+        weights with `load_state_dict_assign`.
+    """
+    register_parameter = torch.nn.Module.register_parameter
+
+    def register_meta_parameter(module, name, param):
+        register_parameter(module, name, param)
+        if param is not None:
+            module._parameters[name] = torch.nn.Parameter(param.to('meta'), requires_grad=param.requires_grad)
+
+    torch.nn.Module.register_parameter = register_meta_parameter
+    try:
+        yield
+    finally:
+        torch.nn.Module.register_parameter = register_parameter
+
+
+def load_state_dict_assign(module, state_dict, device, strict=True):
+    """ Load `state_dict` into a module built under `init_empty_weights`, adopting its tensors without copies.
+
+        Parameters missing from the state dict (only possible with `strict=False`) are materialized as
+        zeros on `device`, so the module holds no `meta` tensors afterwards.
+    """
+    result = module.load_state_dict(state_dict, strict=strict, assign=True)
+    for name, param in list(module.named_parameters()):
+        if param.is_meta:
+            owner_name, _, param_name = name.rpartition('.')
+            owner = module.get_submodule(owner_name) if owner_name else module
+            owner._parameters[param_name] = torch.nn.Parameter(
+                torch.zeros_like(param, device=device), requires_grad=param.requires_grad
+            )
+    return result
+
+
+def safetensors_prefixes(ckpt_path):
+    """ Return the set of top-level key prefixes (e.g. `model`, `vae`) stored in a safetensors file. """
+    from safetensors import safe_open
+
+    with safe_open(ckpt_path, framework='pt', device='cpu') as f:
+        return {key.split('.')[0] for key in f.keys()}
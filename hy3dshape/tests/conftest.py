@@ -0,0 +1,99 @@
+# Hunyuan 3D is licensed under the TENCENT HUNYUAN NON-COMMERCIAL LICENSE AGREEMENT
+# except for the third-party components listed below.
+# Hunyuan 3D does not impose any additional limitations beyond what is outlined
+# in the repsective licenses of these third-party components.
+# Users must comply with all terms and conditions of original licenses of these third-party
+# components and must ensure that the usage of the third party components adheres to
+# all relevant laws and regulations.
+
+# For avoidance of doubts, Hunyuan 3D means the large language models and
+# their software and algorithms, including trained model weights, parameters (including
+# optimizer states), machine-learning model code, inference-enabling code, training-enabling code,
+# fine-tuning enabling code and other elements of the foregoing made publicly available
+# by Tencent in accordance with TENCENT HUNYUAN COMMUNITY LICENSE AGREEMENT.
+
+# Fixtures of the shape pipeline tests: tiny, randomly initialized models that run on CPU in seconds.
+
+import os
+import sys
+
+import pytest
+import torch
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hy3dshape.pipelines import Hunyuan3DDiTFlowMatchingPipeline, instantiate_from_config  # noqa: E402
+
+TINY_CONFIG = {
+    'model': {
+        'target': 'hy3dshape.models.denoisers.hunyuandit.HunYuanDiTPlain',
+        'params': dict(
+            input_size=64, in_channels=8, hidden_size=64, context_dim=32, depth=2, num_heads=4,
+            qk_norm=True, text_len=17, use_attention_pooling=False, qkv_bias=False,
+            num_moe_layers=1, num_experts=2, moe_top_k=1,
+        ),
+    },
+    'vae': {
+        'target': 'hy3dshape.models.autoencoders.ShapeVAE',
+        'params': dict(
+            num_latents=64, embed_dim=8, width=64, heads=4,
+            num_encoder_layers=1, num_decoder_layers=1, qk_norm=True,
+        ),
+    },
+    'conditioner': {
+        'target': 'hy3dshape.models.conditioner.SingleImageEncoder',
+        'params': dict(main_image_encoder=dict(
+            type='DinoImageEncoder',
+            kwargs=dict(
+                config=dict(
+                    hidden_size=32, num_hidden_layers=1, num_attention_heads=2,
+                    intermediate_size=64, image_size=56, patch_size=14,
+                ),
+                image_size=56,
+                use_cls_token=True,
+            ),
+        )),
+    },
+    'image_processor': {
+        'target': 'hy3dshape.preprocessors.ImageProcessorV2',
+        'params': dict(size=56, border_ratio=0.15),
+    },
+    'scheduler': {
+        'target': 'hy3dshape.schedulers.FlowMatchEulerDiscreteScheduler',
+        'params': dict(num_train_timesteps=1000),
+    },
+}
+
+
+@pytest.fixture
+def tiny_pipeline():
+    torch.manual_seed(0)
+    pipeline = Hunyuan3DDiTFlowMatchingPipeline(
+        vae=instantiate_from_config(TINY_CONFIG['vae']),
+        model=instantiate_from_config(TINY_CONFIG['model']),
+        scheduler=instantiate_from_config(TINY_CONFIG['scheduler']),
+        conditioner=instantiate_from_config(TINY_CONFIG['conditioner']),
+        image_processor=instantiate_from_config(TINY_CONFIG['image_processor']),
+        device='cpu',
+    )
+    for component in (pipeline.vae, pipeline.model, pipeline.conditioner):
+        component.eval()
+    return pipeline
+
+
+@pytest.fixture
+def image():
+    image = Image.new('RGBA', (128, 128), (0, 0, 0, 0))
+    image.paste((200, 120, 60, 255), (32, 32, 96, 96))
+    return image
+
+
+@pytest.fixture
+def generate_latents(image):
+    """Two step generation with a fixed seed, so runs of the same pipeline are comparable."""
+    def generate(pipeline):
+        return pipeline(image=image, num_inference_steps=2, output_type='latent',
+                        generator=torch.Generator().manual_seed(0))
+
+    return generate
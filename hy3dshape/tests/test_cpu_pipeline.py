@@ -0,0 +1,36 @@
+# Hunyuan 3D is licensed under the TENCENT HUNYUAN NON-COMMERCIAL LICENSE AGREEMENT
+# except for the third-party components listed below.
+# Hunyuan 3D does not impose any additional limitations beyond what is outlined
+# in the repsective licenses of these third-party components.
+# Users must comply with all terms and conditions of original licenses of these third-party
+# components and must ensure that the usage of the third party components adheres to
+# all relevant laws and regulations.
+
+# For avoidance of doubts, Hunyuan 3D means the large language models and
+# their software and algorithms, including trained model weights, parameters (including
+# optimizer states), machine-learning model code, inference-enabling code, training-enabling code,
+# fine-tuning enabling code and other elements of the foregoing made publicly available
+# by Tencent in accordance with TENCENT HUNYUAN COMMUNITY LICENSE AGREEMENT.
+
+import torch
+
+
+def test_cpu_pipeline_end_to_end(tiny_pipeline, generate_latents):
+    """Conditioner, DiT, VAE decoding and meshing on CPU, without GPUs or checkpoints."""
+    assert tiny_pipeline.device.type == 'cpu'
+    latents = generate_latents(tiny_pipeline)
+    assert latents.shape == (1, 64, 8)
+    assert torch.isfinite(latents).all()
+
+    # the random models give an arbitrary field, take its median as iso level so a surface exists
+    with torch.no_grad(), tiny_pipeline.autocast():
+        decoded = tiny_pipeline.vae(1. / tiny_pipeline.vae.scale_factor * latents)
+        queries = torch.rand(1, 4096, 3) * 2 - 1
+        logits = tiny_pipeline.vae.geo_decoder(queries=queries, latents=decoded)
+    mc_level = logits.float().median().item()
+
+    meshes = tiny_pipeline._export(latents, octree_resolution=32, num_chunks=4096, mc_level=mc_level,
+                                   enable_pbar=False)
+    assert len(meshes) == 1
+    assert meshes[0] is not None
+    assert len(meshes[0].faces) > 0
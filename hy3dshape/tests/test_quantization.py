@@ -0,0 +1,43 @@
+# Hunyuan 3D is licensed under the TENCENT HUNYUAN NON-COMMERCIAL LICENSE AGREEMENT
+# except for the third-party components listed below.
+# Hunyuan 3D does not impose any additional limitations beyond what is outlined
+# in the repsective licenses of these third-party components.
+# Users must comply with all terms and conditions of original licenses of these third-party
+# components and must ensure that the usage of the third party components adheres to
+# all relevant laws and regulations.
+
+# For avoidance of doubts, Hunyuan 3D means the large language models and
+# their software and algorithms, including trained model weights, parameters (including
+# optimizer states), machine-learning model code, inference-enabling code, training-enabling code,
+# fine-tuning enabling code and other elements of the foregoing made publicly available
+# by Tencent in accordance with TENCENT HUNYUAN COMMUNITY LICENSE AGREEMENT.
+
+from hy3dshape.utils import quantize_pipeline, quantization_error
+from hy3dshape.utils.quantization import Int8WeightOnlyLinear
+
+
+def test_int8_quantization_covers_moe_experts(tiny_pipeline, generate_latents):
+    """Quantized DiT including its MoE experts, checked against the fp32 latents."""
+    # the fp run goes through the batched expert path, which stacks the fp expert weights
+    reference = generate_latents(tiny_pipeline)
+    moe_blocks = [module for module in tiny_pipeline.model.modules() if hasattr(module, 'reset_stacked_experts')]
+    assert len(moe_blocks) > 0
+    assert all(block._stacked_experts is not None for block in moe_blocks)
+
+    quantize_pipeline(tiny_pipeline, mode='int8_weight_only')
+    experts = [expert for block in moe_blocks for expert in block.experts]
+    expert_layers = [layer for expert in experts for layer in (expert.net[0].proj, expert.net[2])]
+    assert all(isinstance(layer, Int8WeightOnlyLinear) for layer in expert_layers)
+    assert all(block._stacked_experts is None for block in moe_blocks)
+
+    calls = []
+    handles = [layer.register_forward_hook(lambda *args: calls.append(1)) for layer in expert_layers]
+    quantized = generate_latents(tiny_pipeline)
+    for handle in handles:
+        handle.remove()
+    # the quantized experts run instead of stale stacked fp weights
+    assert len(calls) > 0
+    assert all(block._stacked_experts is None for block in moe_blocks)
+
+    error = quantization_error(reference, quantized)
+    assert 0. < error['rel_l2'] < 0.1
@@ -25,18 +25,8 @@ except Exception as e:
 
 from hy3dshape import Hunyuan3DDiTFlowMatchingPipeline
 from hy3dshape.rembg import BackgroundRemover
-from hy3dshape.utils import logger
+from hy3dshape.utils import logger, SharedWeightStore
 from textureGenPipeline import Hunyuan3DPaintPipeline, Hunyuan3DPaintConfig
-from hy3dpaint.convert_utils import create_glb_with_pbr_materials
-
-
-def quick_convert_with_obj2gltf(obj_path: str, glb_path: str):
-    textures = {
-        'albedo': obj_path.replace('.obj', '.jpg'),
-        'metallic': obj_path.replace('.obj', '_metallic.jpg'),
-        'roughness': obj_path.replace('.obj', '_roughness.jpg')
-        }
-    create_glb_with_pbr_materials(obj_path, textures, glb_path)
 
 
 def load_image_from_base64(image):
@@ -64,7 +54,8 @@ class ModelWorker:
                  low_vram_mode=False,
                  worker_id=None,
                  model_semaphore=None,
-                 save_dir='gradio_cache'):
+                 save_dir='gradio_cache',
+                 shared_weights_dir=None):
         """
         Initialize the model worker.
         
@@ -76,6 +67,8 @@ class ModelWorker:
             worker_id (str): Unique identifier for this worker
             model_semaphore: Semaphore for controlling model concurrency
             save_dir (str): Directory to save generated files
+            shared_weights_dir (str): Directory of a host-wide weight store shared by all workers,
+                so host RAM holds one copy of each model regardless of the worker count
         """
         self.model_path = model_path
         self.worker_id = worker_id or str(uuid.uuid4())[:6]
@@ -89,8 +82,13 @@ class ModelWorker:
         # Initialize background remover
         self.rembg = BackgroundRemover()
         
+        # Host-wide weight store, workers load from it and only the first one reads the checkpoints
+        store = SharedWeightStore(shared_weights_dir) if shared_weights_dir is not None else None
+
         # Initialize shape generation pipeline (matching demo.py)
-        self.pipeline = Hunyuan3DDiTFlowMatchingPipeline.from_pretrained(model_path)
+        self.pipeline = Hunyuan3DDiTFlowMatchingPipeline.from_pretrained(
+            model_path, subfolder=subfolder, device=device, shared_weights=store
+        )
         
         # Initialize texture generation pipeline (matching demo.py)
         max_num_view = 6  # can be 6 to 9
@@ -99,7 +97,7 @@ class ModelWorker:
         conf.realesrgan_ckpt_path = "hy3dpaint/ckpt/RealESRGAN_x4plus.pth"
         conf.multiview_cfg_path = "hy3dpaint/cfgs/hunyuan-paint-pbr.yaml"
         conf.custom_pipeline = "hy3dpaint/hunyuanpaintpbr"
-        self.paint_pipeline = Hunyuan3DPaintPipeline(conf)
+        self.paint_pipeline = Hunyuan3DPaintPipeline(conf, shared_weights=store)
         # clean cache in save_dir
         for file in os.listdir(self.save_dir):
             os.remove(os.path.join(self.save_dir, file))
@@ -163,37 +161,22 @@ class ModelWorker:
             logger.error(f"Shape generation failed: {e}")
             raise ValueError(f"Failed to generate 3D mesh: {str(e)}")
 
-        # Export initial mesh without texture
-        
+        # Export initial mesh without texture, it marks the task as texturing for the status endpoint
         initial_save_path = os.path.join(self.save_dir, f'{str(uid)}_initial.glb')
         mesh.export(initial_save_path)
-        
-        # Generate textured mesh as obj ( as in demo )
+
+        # Texture the mesh in memory and serialize the result once, as a GLB with PBR materials
         try:
-            output_mesh_path_obj = os.path.join(self.save_dir, f'{str(uid)}_texturing.obj')
-            textured_path_obj = self.paint_pipeline(
-                mesh_path=initial_save_path,
+            textured_mesh = self.paint_pipeline(
+                mesh=mesh,
                 image_path=image,
-                output_mesh_path=output_mesh_path_obj,
-                save_glb=False            
+                enhance_mode=params.get('enhance_mode'),
+                unsharp_amount=params.get('unsharp_amount'),
             )
             logger.info("---Texture generation takes %s seconds ---" % (time.time() - start_time))
-            logger.info(f"output_mesh_path: {output_mesh_path_obj} textured_path: {textured_path_obj}")
-            # Use the textured GLB as the final output
-            #final_save_path = os.path.join(self.save_dir, f'{str(uid)}_textured.{file_type}')
-            #os.rename(output_mesh_path, final_save_path)
-
-            # Convert textured OBJ to GLB using obj2gltf with PBR support
-            print("convert textured OBJ to GLB")
-            glb_path_textured = os.path.join(self.save_dir, f'{str(uid)}_texturing.glb')
-            quick_convert_with_obj2gltf(textured_path_obj, glb_path_textured)
-            # now rename glb_path to uid_textured.glb
-            print("done.")
             final_save_path = os.path.join(self.save_dir, f'{str(uid)}_textured.glb')
-            os.rename(glb_path_textured, final_save_path)
-            print(f"final_save_path: {final_save_path}")
-
-            
+            textured_mesh.export(final_save_path)
+            logger.info(f"final_save_path: {final_save_path}")
         except Exception as e:
             logger.error(f"Texture generation failed: {e}")
             # Fall back to untextured mesh if texture generation fails